@@ -0,0 +1,282 @@
+import asyncio
+import hashlib
+import io
+import logging
+import time
+import uuid
+import zipfile
+import zlib
+from dataclasses import dataclass, field, asdict
+from functools import partial
+from pathlib import PurePosixPath
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limits for a single batch upload
+MAX_BATCH_FILES = 50
+MAX_ZIP_ENTRY_BYTES = 200 * 1024 * 1024
+# Uncompressed size of all PDFs in one batch, zipped or not; also caps the raw upload size
+MAX_BATCH_BYTES = 500 * 1024 * 1024
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+# How many batch documents run through the pipeline at the same time, across all batches
+# in one worker process
+BATCH_CONCURRENCY = 4
+
+BATCH_TTL_SECONDS = 24 * 60 * 60
+BATCHES_NAMESPACE = "batches"
+
+# File states
+QUEUED = "queued"
+PROCESSING = "processing"
+DONE = "done"
+FAILED = "failed"
+DUPLICATE = "duplicate"
+
+
+class BatchError(Exception):
+    """Raised for batch uploads that are rejected before any work starts"""
+
+
+@dataclass
+class BatchFile:
+    filename: str
+    sha256: str
+    size: int
+    status: str = QUEUED
+    stage: Optional[str] = None
+    duplicate_of: Optional[str] = None  # filename of the identical file that is processed instead
+    summary_id: Optional[str] = None
+    public_url: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+@dataclass
+class Batch:
+    id: str
+    user_id: str
+    files: List[BatchFile]
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        counts = {state: 0 for state in (QUEUED, PROCESSING, DONE, FAILED, DUPLICATE)}
+        for f in self.files:
+            counts[f.status] += 1
+        data = asdict(self)
+        data["counts"] = counts
+        data["status"] = "completed" if self.finished_at else "running"
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Batch":
+        data = {key: value for key, value in data.items() if key not in ("counts", "status")}
+        data["files"] = [BatchFile(**f) for f in data["files"]]
+        return cls(**data)
+
+
+class BatchStore:
+    """Batch status in the shared state backend, kept for BATCH_TTL_SECONDS.
+
+    The worker running a batch saves it on every change, so status polls can be
+    answered by any worker.
+    """
+
+    def __init__(self, state, ttl_seconds: int = BATCH_TTL_SECONDS):
+        self._state = state
+        self._ttl_seconds = ttl_seconds
+        # Latest unsaved snapshot and the task writing it, per batch
+        self._pending: Dict[str, dict] = {}
+        self._writers: Dict[str, asyncio.Task] = {}
+
+    def save(self, batch: Batch):
+        self._state.set(BATCHES_NAMESPACE, batch.id, asdict(batch), self._ttl_seconds)
+
+    def save_later(self, batch: Batch):
+        """Save from the event loop without blocking it on the state backend.
+
+        Writes for one batch run one at a time in a thread, and a newer snapshot
+        replaces one still waiting, so an older status never overwrites a newer one.
+        """
+        self._pending[batch.id] = asdict(batch)
+        if batch.id not in self._writers:
+            self._writers[batch.id] = asyncio.get_running_loop().create_task(self._flush(batch.id))
+
+    async def _flush(self, batch_id: str):
+        try:
+            while batch_id in self._pending:
+                data = self._pending.pop(batch_id)
+                try:
+                    await asyncio.to_thread(self._state.set, BATCHES_NAMESPACE, batch_id, data, self._ttl_seconds)
+                except Exception as e:
+                    logger.error(f"Saving batch {batch_id} failed: {str(e)}")
+        finally:
+            self._writers.pop(batch_id, None)
+
+    def get(self, batch_id: str, user_id: str) -> Optional[Batch]:
+        data = self._state.get(BATCHES_NAMESPACE, batch_id)
+        if not data or data["user_id"] != user_id:
+            return None
+        return Batch.from_dict(data)
+
+
+async def read_uploads(files, limit: int = MAX_BATCH_BYTES) -> List[Tuple[str, bytes]]:
+    """Read uploaded files into (filename, content) pairs, refusing more than `limit` bytes in total.
+
+    Declared sizes are checked before reading; uploads without one are read in
+    chunks and rejected as soon as the total goes over.
+    """
+    too_large = f"Batch is too large; the limit is {limit // (1024 * 1024)} MB"
+    declared = sum(f.size or 0 for f in files)
+    if declared > limit:
+        raise BatchError(too_large)
+
+    uploads = []
+    total_bytes = 0
+    for f in files:
+        chunks = []
+        while True:
+            chunk = await f.read(UPLOAD_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            total_bytes += len(chunk)
+            if total_bytes > limit:
+                raise BatchError(too_large)
+            chunks.append(chunk)
+        uploads.append((f.filename, b"".join(chunks)))
+    return uploads
+
+
+def _read_entry(archive_name: str, entry_name: str, reader: Callable[[], bytes]) -> bytes:
+    try:
+        return reader()
+    except (RuntimeError, zipfile.BadZipFile, zlib.error, EOFError) as e:
+        # Encrypted entries and unsupported compression such as Deflate64 raise
+        # RuntimeError (NotImplementedError); corrupt streams raise the others
+        raise BatchError(f"{entry_name} in {archive_name} could not be extracted: {str(e) or type(e).__name__}")
+
+
+def expand_uploads(uploads: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """Flatten uploaded PDFs and zip archives into a list of (filename, content) PDFs.
+
+    The file count and total size are checked against the zip headers before
+    anything is decompressed, so oversized archives are rejected cheaply.
+    """
+    # (filename, source, reader); zip entries are only decompressed once everything fits
+    entries: List[Tuple[str, str, Callable[[], bytes]]] = []
+    archives = []
+    total_bytes = 0
+
+    def add(entry_name: str, source: str, reader: Callable[[], bytes], size: int):
+        nonlocal total_bytes
+        entries.append((entry_name, source, reader))
+        total_bytes += size
+        if len(entries) > MAX_BATCH_FILES:
+            raise BatchError(f"Too many files in batch; the limit is {MAX_BATCH_FILES}")
+        if total_bytes > MAX_BATCH_BYTES:
+            raise BatchError(f"Batch is too large; the limit is {MAX_BATCH_BYTES // (1024 * 1024)} MB uncompressed")
+
+    try:
+        for filename, content in uploads:
+            name = PurePosixPath(filename or "upload").name
+            if zipfile.is_zipfile(io.BytesIO(content)):
+                archive = zipfile.ZipFile(io.BytesIO(content))
+                archives.append(archive)
+                for info in archive.infolist():
+                    entry_name = PurePosixPath(info.filename).name
+                    if (info.is_dir() or info.filename.startswith("__MACOSX/")
+                            or entry_name.startswith(".") or not entry_name.lower().endswith(".pdf")):
+                        continue
+                    if info.file_size > MAX_ZIP_ENTRY_BYTES:
+                        raise BatchError(f"{entry_name} in {name} is too large")
+                    # Reads stop at the size declared in the header, so the totals hold
+                    add(entry_name, name, partial(archive.read, info), info.file_size)
+            elif name.lower().endswith(".pdf"):
+                add(name, name, partial(bytes, content), len(content))
+            else:
+                raise BatchError(f"{name} is not a PDF or zip archive")
+
+        if not entries:
+            raise BatchError("No PDF files found in upload")
+        return [(entry_name, _read_entry(source, entry_name, reader)) for entry_name, source, reader in entries]
+    finally:
+        for archive in archives:
+            archive.close()
+
+
+def create_batch(user_id: str, pdfs: List[Tuple[str, bytes]]) -> Tuple[Batch, Dict[str, bytes]]:
+    """Build a batch, marking byte-identical files as duplicates of the first copy.
+
+    Returns the batch and the content to process, keyed by sha256.
+    """
+    files = []
+    contents: Dict[str, bytes] = {}
+    first_by_hash: Dict[str, str] = {}
+    for filename, content in pdfs:
+        digest = hashlib.sha256(content).hexdigest()
+        entry = BatchFile(filename=filename, sha256=digest, size=len(content))
+        if digest in first_by_hash:
+            entry.status = DUPLICATE
+            entry.duplicate_of = first_by_hash[digest]
+        else:
+            first_by_hash[digest] = filename
+            contents[digest] = content
+        files.append(entry)
+    return Batch(id=str(uuid.uuid4()), user_id=user_id, files=files), contents
+
+
+ProcessFn = Callable[[str, bytes, Callable[[str], None]], Awaitable[dict]]
+
+
+async def run_batch(batch: Batch, contents: Dict[str, bytes], process: ProcessFn,
+                    semaphore: asyncio.Semaphore, on_change: Callable[[Batch], None] = lambda batch: None):
+    """Run `process(filename, content, on_stage)` for every unique file.
+
+    `semaphore` is shared by all batches in the process, so parallelism stays
+    bounded however many batches are running. `on_change` is called after every
+    status change, e.g. to publish the batch to other workers; it runs on the
+    event loop, so it must not block.
+    """
+    async def run_one(entry: BatchFile):
+        async with semaphore:
+            entry.status = PROCESSING
+            entry.started_at = time.time()
+            on_change(batch)
+
+            def on_stage(stage: str):
+                entry.stage = stage
+                on_change(batch)
+
+            try:
+                result = await process(entry.filename, contents.pop(entry.sha256), on_stage)
+                entry.summary_id = result.get("summary_id")
+                entry.public_url = result.get("public_url")
+                entry.status = DONE
+            except Exception as e:
+                detail = getattr(e, "detail", None) or str(e)
+                logger.error(f"Batch {batch.id}: {entry.filename} failed: {detail}")
+                entry.error = detail
+                entry.status = FAILED
+            finally:
+                entry.stage = None
+                entry.finished_at = time.time()
+                on_change(batch)
+
+    unique = [f for f in batch.files if f.status != DUPLICATE]
+    await asyncio.gather(*(run_one(f) for f in unique))
+
+    # Duplicates share the result of the file they were deduplicated against
+    by_hash = {f.sha256: f for f in unique}
+    for entry in batch.files:
+        if entry.status == DUPLICATE:
+            original = by_hash[entry.sha256]
+            entry.summary_id = original.summary_id
+            entry.public_url = original.public_url
+            entry.error = original.error
+            entry.finished_at = original.finished_at
+
+    batch.finished_at = time.time()
+    on_change(batch)
+    logger.info(f"Batch {batch.id} finished: {batch.to_dict()['counts']}")
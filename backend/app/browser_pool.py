@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from .metrics import BROWSER_LAUNCHES, BROWSER_PAGES_IN_USE, BROWSER_PAGES_WAITING
+
+logger = logging.getLogger(__name__)
+
+# Worker processes serving the app (set by gunicorn.conf.py in multi-worker mode)
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def pages_per_worker() -> int:
+    """Concurrent pages per process. Each page is an isolated browser context.
+
+    BROWSER_TOTAL_PAGES caps pages across all workers (each worker gets an equal
+    share, at least one); otherwise every worker gets BROWSER_MAX_PAGES.
+    """
+    total = os.getenv("BROWSER_TOTAL_PAGES")
+    if total:
+        return max(1, int(total) // WEB_CONCURRENCY)
+    return int(os.getenv("BROWSER_MAX_PAGES", "2"))
+
+
+BROWSER_MAX_PAGES = pages_per_worker()
+
+# A long-lived browser serving several pages needs Chromium's normal multi-process
+# mode, so unlike the old one-shot launch this does not pass --single-process.
+BROWSER_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-gpu',
+]
+
+
+class BrowserPool:
+    """One shared Chromium per process with a bounded number of concurrent pages.
+
+    The browser is launched on first use and relaunched if it crashes, instead of
+    paying a full Chromium start for every PDF.
+    """
+
+    def __init__(self, max_pages: int = BROWSER_MAX_PAGES):
+        self.max_pages = max_pages
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self.pages_in_use = 0
+        self.last_error = None
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("Browser disconnected - relaunching Chromium")
+            logger.info("Attempting to launch Chromium browser...")
+            BROWSER_LAUNCHES.inc()
+            try:
+                if self._playwright is None:
+                    # Playwright is only needed once something renders, so keep it off the import path
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True,
+                    args=BROWSER_LAUNCH_ARGS
+                )
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            logger.info("Browser launched successfully")
+            self.last_error = None
+            return self._browser
+
+    async def warm(self):
+        """Launch Chromium ahead of the first render; failures are logged, not raised"""
+        try:
+            await self._ensure_browser()
+        except Exception as e:
+            logger.error(f"Browser warm-up failed: {str(e)}")
+
+    def status(self) -> str:
+        if self._browser is not None and self._browser.is_connected():
+            return "ready"
+        if self.last_error:
+            return "error"
+        return "not_started"
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a fresh page in its own context; waits while the pool is at capacity"""
+        with BROWSER_PAGES_WAITING.track_inprogress():
+            await self._semaphore.acquire()
+        try:
+            browser = await self._ensure_browser()
+            context = await browser.new_context()
+            self.pages_in_use += 1
+            BROWSER_PAGES_IN_USE.inc()
+            try:
+                yield await context.new_page()
+            finally:
+                self.pages_in_use -= 1
+                BROWSER_PAGES_IN_USE.dec()
+                try:
+                    await context.close()
+                except Exception as e:
+                    # The browser may have crashed mid-render; the next borrow relaunches it
+                    logger.warning(f"Failed to close browser context: {str(e)}")
+        finally:
+            self._semaphore.release()
+
+    async def close(self):
+        async with self._launch_lock:
+            if self._browser is not None:
+                await self._browser.close()
+                self._browser = None
+                logger.info("Browser closed")
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
@@ -0,0 +1,244 @@
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional
+
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Document text budget for the system prompt (leave room for history and question)
+MAX_CONTEXT_LENGTH = 24000
+
+# Number of most recent messages (user + assistant) kept verbatim in the prompt.
+# Older messages are folded into a rolling summary so the prompt stays bounded.
+RECENT_MESSAGES = 6
+# Fold only once this many extra messages have piled up, so we summarize in batches
+FOLD_BATCH = 4
+# Hard cap on verbatim messages sent, in case a fold is still running in the background
+MAX_VERBATIM_MESSAGES = RECENT_MESSAGES + FOLD_BATCH
+SUMMARY_MAX_CHARS = 2000
+
+SESSION_TTL_SECONDS = 6 * 60 * 60
+MAX_SESSIONS = 1000
+MAX_CACHED_PREFIXES = 64
+MAX_SESSIONS_PER_DOCUMENT = 200
+
+# Shared state namespaces
+SESSIONS_NAMESPACE = "chat_sessions"
+DOCUMENT_SESSIONS_NAMESPACE = "chat_sessions_by_document"
+PREFIXES_NAMESPACE = "chat_prefixes"
+
+SUMMARY_MODEL = "gpt-4.1-nano"
+
+
+@dataclass
+class ChatSession:
+    id: str
+    user_id: str
+    document_id: str
+    summary: str = ""
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ChatSessionStore:
+    """Chat sessions keyed by session id, evicted by TTL and LRU size.
+
+    Sessions live in the shared state backend, so any worker can continue a
+    conversation another worker started.
+    """
+
+    def __init__(self, state, ttl_seconds: int = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS):
+        self._state = state
+        self._ttl_seconds = ttl_seconds
+        self._max_sessions = max_sessions
+
+    def create(self, user_id: str, document_id: str) -> ChatSession:
+        session = ChatSession(id=str(uuid.uuid4()), user_id=user_id, document_id=document_id)
+        self._state.set(SESSIONS_NAMESPACE, session.id, session.to_dict(), self._ttl_seconds, self._max_sessions)
+
+        # Remember which sessions belong to the document so deleting it can drop them
+        def add_to_index(index: Optional[dict]) -> dict:
+            session_ids = (index or {}).get("session_ids", [])
+            return {"session_ids": (session_ids + [session.id])[-MAX_SESSIONS_PER_DOCUMENT:]}
+
+        self._state.update(DOCUMENT_SESSIONS_NAMESPACE, document_id, add_to_index, self._ttl_seconds)
+        return session
+
+    def get(self, session_id: str, user_id: str, document_id: Optional[str] = None) -> Optional[ChatSession]:
+        data = self._state.get(SESSIONS_NAMESPACE, session_id)
+        if not data or data["user_id"] != user_id:
+            return None
+        if document_id is not None and data["document_id"] != document_id:
+            return None
+        return ChatSession(**data)
+
+    def update(self, session_id: str, mutate: Callable[[ChatSession], None]) -> Optional[ChatSession]:
+        """Apply `mutate` to a session atomically and mark it recently used"""
+        def apply(data: Optional[dict]) -> Optional[dict]:
+            if data is None:
+                return None
+            session = ChatSession(**data)
+            mutate(session)
+            session.updated_at = time.time()
+            return session.to_dict()
+
+        data = self._state.update(SESSIONS_NAMESPACE, session_id, apply, self._ttl_seconds, self._max_sessions)
+        return ChatSession(**data) if data else None
+
+    def delete(self, session_id: str, user_id: str) -> bool:
+        if not self.get(session_id, user_id):
+            return False
+        return self._state.delete(SESSIONS_NAMESPACE, session_id)
+
+    def delete_for_document(self, document_id: str):
+        index = self._state.get(DOCUMENT_SESSIONS_NAMESPACE, document_id)
+        for session_id in (index or {}).get("session_ids", []):
+            self._state.delete(SESSIONS_NAMESPACE, session_id)
+        self._state.delete(DOCUMENT_SESSIONS_NAMESPACE, document_id)
+
+
+class PromptPrefixCache:
+    """Small LRU of per-document system prompts so repeat turns skip the DB fetch
+    and send a byte-identical prefix (which is what provider prompt caching keys on)"""
+
+    def __init__(self, state, max_entries: int = MAX_CACHED_PREFIXES, ttl_seconds: int = SESSION_TTL_SECONDS):
+        self._state = state
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+
+    def get(self, document_id: str) -> Optional[dict]:
+        return self._state.get(PREFIXES_NAMESPACE, document_id)
+
+    def put(self, document_id: str, entry: dict):
+        self._state.set(PREFIXES_NAMESPACE, document_id, entry, self._ttl_seconds, self._max_entries)
+
+    def invalidate(self, document_id: str):
+        self._state.delete(PREFIXES_NAMESPACE, document_id)
+
+
+def truncate_document_text(extracted_text: str, max_length: int = MAX_CONTEXT_LENGTH) -> str:
+    """Keep the first and last part of the document if it is too long for the API"""
+    if len(extracted_text) <= max_length:
+        return extracted_text
+    first_part = extracted_text[:max_length // 2]
+    last_part = extracted_text[-(max_length // 2):]
+    return f"{first_part}\n\n[... middle content truncated ...]\n\n{last_part}"
+
+
+def build_document_prefix(document: dict) -> str:
+    """Build the stable system prompt for a document.
+
+    This must depend only on the document so every turn of every session on the
+    same document sends an identical prefix.
+    """
+    extracted_text = document.get('extracted_text') or ''
+    if not extracted_text:
+        return (
+            f'You are an AI assistant helping users understand a document titled "{document["title"]}".\n\n'
+            "I apologize, but the full document content is not available for this document. "
+            "This may be because it was processed before the text extraction feature was added.\n\n"
+            "I can provide general assistance about the document based on its title and filename, "
+            "but I cannot reference specific content.\n\n"
+            f"Document title: {document['title']}\n"
+            f"Original filename: {document['original_filename']}\n\n"
+            "Please let me know how I can help you with this document."
+        )
+
+    return (
+        f'You are an AI assistant helping users understand a document titled "{document["title"]}".\n\n'
+        "You have access to the FULL ORIGINAL TEXT CONTENT of this document below. "
+        "Use this content to answer questions accurately and in detail.\n\n"
+        "Be helpful, accurate, and specific. You can reference specific sections, quote relevant passages, "
+        "and provide detailed explanations based on the document content.\n\n"
+        "If the user asks about something not covered in the document, clearly state that the "
+        "information is not available in this document.\n\n"
+        f"Document title: {document['title']}\n"
+        f"Original filename: {document['original_filename']}\n\n"
+        "DOCUMENT CONTENT:\n"
+        f"{truncate_document_text(extracted_text)}"
+    )
+
+
+def build_messages(prefix: str, session: ChatSession, question: str) -> List[Dict[str, str]]:
+    """Lay out the prompt as: stable document prefix, rolling summary, recent turns, question"""
+    messages = [{"role": "system", "content": prefix}]
+    if session.summary:
+        messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation about this document:\n{session.summary}"
+        })
+    messages.extend(session.turns[-MAX_VERBATIM_MESSAGES:])
+    messages.append({"role": "user", "content": question})
+    return messages
+
+
+def needs_fold(session: ChatSession) -> bool:
+    return len(session.turns) >= RECENT_MESSAGES + FOLD_BATCH
+
+
+def _fallback_summary(previous_summary: str, turns: List[Dict[str, str]]) -> str:
+    lines = [previous_summary] if previous_summary else []
+    for turn in turns:
+        speaker = "User" if turn["role"] == "user" else "Assistant"
+        lines.append(f"{speaker}: {turn['content'][:300]}")
+    return "\n".join(lines)[-SUMMARY_MAX_CHARS:]
+
+
+def summarize_turns(client, previous_summary: str, turns: List[Dict[str, str]]) -> str:
+    """Fold older turns into the running conversation summary"""
+    transcript = "\n".join(
+        f"{'User' if t['role'] == 'user' else 'Assistant'}: {t['content']}" for t in turns
+    )
+    try:
+        response = client.chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "You maintain a running summary of a conversation about a financial document. "
+                        "Merge the new exchanges into the existing summary. Keep figures, page references "
+                        "and open questions. Reply with the updated summary only, at most 200 words."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew exchanges:\n{transcript}"
+                }
+            ]
+        )
+        summary = response.choices[0].message.content or ""
+        if summary.strip():
+            return summary.strip()[:SUMMARY_MAX_CHARS]
+    except Exception as e:
+        logger.warning(f"Conversation summarization failed, using plain transcript: {str(e)}")
+    return _fallback_summary(previous_summary, turns)
+
+
+def fold_session(store: ChatSessionStore, session_id: str, client):
+    """Summarize the oldest turns of a session so only RECENT_MESSAGES stay verbatim"""
+    snapshot = store.update(session_id, lambda s: None)
+    if not snapshot or not needs_fold(snapshot):
+        return
+
+    fold_count = len(snapshot.turns) - RECENT_MESSAGES
+    folded_turns = list(snapshot.turns[:fold_count])
+    with stage_timer("chat_fold"):
+        new_summary = summarize_turns(client, snapshot.summary, folded_turns)
+
+    def apply(session: ChatSession):
+        # Turns are only ever appended, so the folded ones are still at the front
+        # unless a concurrent fold got there first
+        if session.turns[:fold_count] != folded_turns:
+            return
+        del session.turns[:fold_count]
+        session.summary = new_summary
+
+    store.update(session_id, apply)
+    logger.info(f"Folded {fold_count} messages into summary for chat session {session_id}")
@@ -0,0 +1,50 @@
+import base64
+import logging
+import os
+import zlib
+from typing import List
+
+from .metrics import BYTES_SAVED
+
+logger = logging.getLogger(__name__)
+
+# Large text columns are stored as this prefix followed by base64(zlib(utf-8 text)).
+# Values without the prefix (older rows, short texts) are returned unchanged.
+COMPRESSED_PREFIX = "zlib+b64:"
+COMPRESSED_FIELDS = ("extracted_text",)
+TEXT_COMPRESSION_MIN_CHARS = int(os.getenv("TEXT_COMPRESSION_MIN_CHARS", "4096"))
+COMPRESS_TEXT_FIELDS = os.getenv("COMPRESS_TEXT_FIELDS", "1") == "1"
+
+
+def compress_text(text: str) -> str:
+    if not COMPRESS_TEXT_FIELDS or len(text) < TEXT_COMPRESSION_MIN_CHARS or text.startswith(COMPRESSED_PREFIX):
+        return text
+    raw = text.encode("utf-8")
+    encoded = COMPRESSED_PREFIX + base64.b64encode(zlib.compress(raw, 6)).decode("ascii")
+    if len(encoded) >= len(raw):
+        return text
+    BYTES_SAVED.labels("text").inc(len(raw) - len(encoded))
+    return encoded
+
+
+def decompress_text(value):
+    if not isinstance(value, str) or not value.startswith(COMPRESSED_PREFIX):
+        return value
+    return zlib.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode("utf-8")
+
+
+def compress_row(row: dict) -> dict:
+    """Copy of a `summaries` row with its large text fields compressed for storage"""
+    compressed = dict(row)
+    for field in COMPRESSED_FIELDS:
+        if isinstance(compressed.get(field), str):
+            compressed[field] = compress_text(compressed[field])
+    return compressed
+
+
+def decompress_rows(rows: List[dict]) -> List[dict]:
+    for row in rows:
+        for field in COMPRESSED_FIELDS:
+            if field in row:
+                row[field] = decompress_text(row[field])
+    return rows
@@ -0,0 +1,127 @@
+import json
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+DIGEST_MODEL = "gpt-4.1-mini"
+
+# Facts most chat questions are about. Each maps to a list of {"fact", "page"} items.
+DIGEST_FIELDS = {
+    "company_overview": "What the company does, where, founding year, headcount",
+    "revenue": "Revenue figures and growth by period",
+    "ebitda": "EBITDA / adjusted EBITDA figures and adjustments by period",
+    "margins": "Gross, EBITDA and other margins by period",
+    "customer_concentration": "Top customers, share of revenue, contract terms",
+    "management": "Key executives, roles, tenure, ownership and post-deal plans",
+    "deal_process": "Seller, advisor, transaction type, timeline and bid instructions",
+}
+
+# The model replies with exactly this when the fact sheet can't answer a question
+NOT_IN_DIGEST = "NOT_IN_DIGEST"
+
+
+def _digest_instructions() -> str:
+    fields = "\n".join(f'- "{name}": {description}' for name, description in DIGEST_FIELDS.items())
+    return (
+        "You extract a fact sheet from a Confidential Information Memorandum (CIM). "
+        "The text is split by '--- Page N ---' markers.\n\n"
+        "Return a JSON object with exactly these keys:\n"
+        f"{fields}\n\n"
+        'Each value is a list of objects {"fact": string, "page": integer}. '
+        "Facts must be short, numbers-first and stated in the CIM; page is the page number "
+        "the fact appears on. Use an empty list when the CIM does not cover a key. "
+        "Do not infer or estimate anything."
+    )
+
+
+def _clean_digest(raw: dict) -> dict:
+    digest = {}
+    for name in DIGEST_FIELDS:
+        items = raw.get(name) or []
+        if not isinstance(items, list):
+            items = []
+        cleaned = []
+        for item in items:
+            if not isinstance(item, dict) or not str(item.get("fact", "")).strip():
+                continue
+            page = item.get("page")
+            cleaned.append({
+                "fact": str(item["fact"]).strip(),
+                "page": page if isinstance(page, int) else None
+            })
+        digest[name] = cleaned
+    return digest
+
+
+def build_digest(client, page_text: str) -> Optional[dict]:
+    """Extract the structured fact sheet for a document. Returns None on failure."""
+    if not page_text.strip():
+        return None
+    try:
+        response = client.chat.completions.create(
+            model=DIGEST_MODEL,
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": _digest_instructions()},
+                {"role": "user", "content": page_text}
+            ]
+        )
+        content = response.choices[0].message.content
+        if not content:
+            logger.warning("Digest extraction returned no content")
+            return None
+        digest = _clean_digest(json.loads(content))
+        logger.info(f"Extracted digest with {sum(len(v) for v in digest.values())} facts")
+        return digest
+    except Exception as e:
+        logger.warning(f"Digest extraction failed: {str(e)}")
+        return None
+
+
+def format_digest(digest: dict) -> str:
+    """Render a digest as a compact, cited fact list for prompts"""
+    lines = []
+    for name in DIGEST_FIELDS:
+        items = digest.get(name) or []
+        if not items:
+            continue
+        lines.append(f"{name.replace('_', ' ').title()}:")
+        for item in items:
+            citation = f" (p. {item['page']})" if item.get("page") else ""
+            lines.append(f"- {item['fact']}{citation}")
+    return "\n".join(lines)
+
+
+def build_digest_prefix(document: dict) -> Optional[str]:
+    """Stable system prompt that answers from the fact sheet only.
+
+    Returns None when the document has no usable digest.
+    """
+    digest = document.get("digest")
+    if isinstance(digest, str):
+        try:
+            digest = json.loads(digest)
+        except ValueError:
+            return None
+    if not digest:
+        return None
+    facts = format_digest(digest)
+    if not facts:
+        return None
+
+    return (
+        f'You are an AI assistant helping users understand a document titled "{document["title"]}".\n\n'
+        "Below is a fact sheet extracted from the document, with page citations. "
+        "Answer the question using only these facts and cite pages as (p. #).\n\n"
+        "If the fact sheet does not contain what is needed to answer accurately, reply with exactly "
+        f"{NOT_IN_DIGEST} and nothing else.\n\n"
+        f"Document title: {document['title']}\n"
+        f"Original filename: {document['original_filename']}\n\n"
+        "FACT SHEET:\n"
+        f"{facts}"
+    )
+
+
+def is_digest_miss(answer: Optional[str]) -> bool:
+    return not answer or NOT_IN_DIGEST in answer
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often dependency checks run in the background; /health only reads the last result
+HEALTH_REFRESH_SECONDS = float(os.getenv("HEALTH_REFRESH_SECONDS", "30"))
+HEALTH_CHECK_TIMEOUT = 5
+
+
+class HealthMonitor:
+    """Runs blocking dependency checks on an interval and caches the results.
+
+    Each check returns a `{"success", "message"}` dict like the `sync_*` helpers,
+    so probes never wait on a network round trip.
+    """
+
+    def __init__(self, checks: Dict[str, Callable[[], dict]], interval: float = HEALTH_REFRESH_SECONDS):
+        self._checks = checks
+        self._interval = interval
+        self._results: Dict[str, dict] = {}
+        self.checked_at: Optional[float] = None
+
+    async def _run_check(self, name: str, check: Callable[[], dict]) -> dict:
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(check), timeout=HEALTH_CHECK_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {"success": False, "message": f"{name} check timed out after {HEALTH_CHECK_TIMEOUT}s"}
+        except Exception as e:
+            return {"success": False, "message": str(e)}
+
+    async def refresh(self):
+        names = list(self._checks)
+        results = await asyncio.gather(*(self._run_check(name, self._checks[name]) for name in names))
+        for name, result in zip(names, results):
+            previous = self._results.get(name)
+            if not result["success"] and (previous is None or previous["success"]):
+                logger.warning(f"Health check {name} failing: {result['message']}")
+            self._results[name] = result
+        self.checked_at = time.time()
+
+    async def run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._interval)
+
+    def snapshot(self) -> dict:
+        """Last known state of every check: working, error or unknown (not checked yet)"""
+        dependencies = {}
+        for name in self._checks:
+            result = self._results.get(name)
+            if result is None:
+                dependencies[name] = {"status": "unknown"}
+            elif result["success"]:
+                dependencies[name] = {"status": "working"}
+            else:
+                dependencies[name] = {"status": "error", "error": result["message"]}
+        return {
+            "dependencies": dependencies,
+            "checked_at": self.checked_at,
+            "age_seconds": round(time.time() - self.checked_at, 1) if self.checked_at else None,
+        }
@@ -1,37 +1,69 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
-from fastapi.responses import FileResponse, Response
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, BackgroundTasks, Request
+from fastapi.responses import FileResponse, RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-import subprocess
 import os
+import re
 import uuid
 import logging
 import traceback
-from playwright.async_api import async_playwright
-from playwright.sync_api import sync_playwright
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import List, Optional
-from .models import CIMSummary, ChatRequest
-from supabase import create_client, Client
+from .models import BulkDeleteRequest, CIMSummary, ChatRequest
+from .chat import (
+    ChatSessionStore,
+    PromptPrefixCache,
+    build_document_prefix,
+    build_messages,
+    fold_session,
+    needs_fold,
+)
+from .digest import build_digest, build_digest_prefix, is_digest_miss
+from .batch import BatchError, BatchStore, BATCH_CONCURRENCY, create_batch, expand_uploads, read_uploads, run_batch
+from .browser_pool import BrowserPool, WEB_CONCURRENCY
+from .health import HealthMonitor
+from .pipeline import Step, run_dag
+from .compression import compress_row, decompress_rows
+from .shared_state import RateBudget, create_state
+from .storage_gc import OrphanSweeper
+from .metrics import (
+    BYTES_SAVED,
+    HTTP_REQUEST_SECONDS,
+    JOBS_IN_FLIGHT,
+    instrument_openai,
+    observe_pdf,
+    record_stage_error,
+    stage_timer,
+)
+from .tracing import TRACE_HEADER, configure_logging, new_trace_id, trace_id
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, multiprocess
+from utils.extract_text import extract_text_from_pdf, format_text_blocks, get_page_count
+from utils.process_with_openai import load_prompt, summarize_text
+from utils.html_to_pdf import PDF_OPTIONS
+from utils.optimize_pdf import optimize_pdf_bytes
+from utils.thumbnail import THUMBNAIL_WIDTH, render_thumbnail
 import os
 from dotenv import load_dotenv
 import tempfile
 from datetime import datetime
 import asyncio
+import time
+import zipfile
 from concurrent.futures import ThreadPoolExecutor
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Set up logging (every line carries the request's trace ID)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
-# Debug logging for environment variables
+# Debug logging for environment variables (never log the secrets themselves)
 logger.info("Current working directory: %s", os.getcwd())
 logger.info("SUPABASE_URL: %s", os.getenv("SUPABASE_URL"))
-logger.info("SUPABASE_SERVICE_KEY: %s", os.getenv("SUPABASE_SERVICE_KEY"))
+logger.info("SUPABASE_SERVICE_KEY set: %s", bool(os.getenv("SUPABASE_SERVICE_KEY")))
 
-# Initialize Supabase client
+# Supabase configuration (the client itself is created on first use, see get_supabase)
 supabase_url = os.getenv("SUPABASE_URL", "")
 supabase_key = os.getenv("SUPABASE_SERVICE_KEY", "")
 
@@ -39,13 +71,118 @@ if not supabase_url or not supabase_key:
     logger.error("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in environment variables")
     raise ValueError("Missing Supabase configuration")
 
-supabase: Client = create_client(supabase_url, supabase_key)
-
 # Get the project root directory
 ROOT_DIR = Path(__file__).parent.parent
-UTILS_DIR = ROOT_DIR / "utils"
 
-app = FastAPI()
+# Launch Chromium in the background at startup so the first upload doesn't pay for it
+BROWSER_WARM_ON_STARTUP = os.getenv("BROWSER_WARM_ON_STARTUP", "1") == "1"
+# Seconds between browser warm-ups of successive workers, so they don't all launch Chromium at once
+BROWSER_WARM_STAGGER_SECONDS = float(os.getenv("BROWSER_WARM_STAGGER_SECONDS", "2"))
+
+# OpenAI requests per minute across all workers (unset = no limit)
+OPENAI_RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "0"))
+
+# Caches and job status; must be a cross-process backend when running several workers
+shared_state = create_state()
+if WEB_CONCURRENCY > 1 and not shared_state.shared_across_processes:
+    logger.warning(
+        f"WEB_CONCURRENCY={WEB_CONCURRENCY} with an in-memory state backend - chat sessions and "
+        "batch status will not be visible across workers. Set STATE_BACKEND_URL (see gunicorn.conf.py)."
+    )
+
+# Server-side chat state for /chat-pdf
+chat_sessions = ChatSessionStore(shared_state)
+prompt_prefixes = PromptPrefixCache(shared_state)
+
+# Shared Chromium for HTML -> PDF rendering
+browser_pool = BrowserPool()
+
+# Bulk ingestion state
+batches = BatchStore(shared_state)
+batch_semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+background_jobs = set()
+
+_openai_client = None
+_supabase_client = None
+
+def get_openai_client():
+    """Shared OpenAI client, or None if OPENAI_API_KEY is not configured"""
+    global _openai_client
+    if _openai_client is None:
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            return None
+        from openai import OpenAI
+        client = instrument_openai(OpenAI(api_key=openai_api_key))
+        if OPENAI_RPM_LIMIT:
+            budget = RateBudget(shared_state, "openai", OPENAI_RPM_LIMIT)
+            client.chat.completions.create = budget.wrap(client.chat.completions.create)
+        _openai_client = client
+    return _openai_client
+
+def get_supabase():
+    """Shared Supabase client, imported and created on first use (only auth still needs it)"""
+    global _supabase_client
+    if _supabase_client is None:
+        from supabase import create_client
+        _supabase_client = create_client(supabase_url, supabase_key)
+    return _supabase_client
+
+def warm_clients():
+    """Import and build the SDK clients off the request path"""
+    get_supabase()
+    get_openai_client()
+
+def sync_supabase_ping() -> dict:
+    """Cheap reachability check for the summaries table (no row count)"""
+    try:
+        import requests
+
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+        }
+        url = f"{supabase_url}/rest/v1/summaries"
+        response = requests.get(url, headers=headers, params={"select": "id", "limit": "1"}, timeout=5)
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        return {"success": True, "message": "Supabase reachable"}
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Supabase ping failed: {str(e)}"
+        }
+
+health_monitor = HealthMonitor({"supabase": sync_supabase_ping})
+
+async def warm_browser():
+    if WEB_CONCURRENCY > 1 and shared_state.shared_across_processes:
+        # Workers take turns so their Chromium launches don't compete for CPU at boot
+        slot = await asyncio.to_thread(shared_state.incr, "startup", "browser_warm", 120)
+        await asyncio.sleep(((slot - 1) % WEB_CONCURRENCY) * BROWSER_WARM_STAGGER_SECONDS)
+    await browser_pool.warm()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing here blocks startup: the app starts serving while these run
+    startup_tasks = [
+        asyncio.create_task(asyncio.to_thread(warm_clients)),
+        asyncio.create_task(health_monitor.run()),
+        asyncio.create_task(orphan_sweeper.run()),
+    ]
+    if BROWSER_WARM_ON_STARTUP:
+        startup_tasks.append(asyncio.create_task(warm_browser()))
+    try:
+        yield
+    finally:
+        for task in startup_tasks:
+            task.cancel()
+        await asyncio.gather(*startup_tasks, return_exceptions=True)
+        await browser_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -63,6 +200,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def trace_and_time_requests(request: Request, call_next):
+    """Tag the request with a trace ID (from X-Request-ID if sent) and record its latency"""
+    token = trace_id.set(new_trace_id(request.headers.get(TRACE_HEADER)))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers[TRACE_HEADER] = trace_id.get()
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status)
+        ).observe(time.perf_counter() - start)
+        trace_id.reset(token)
+
+@app.get("/metrics")
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics. Set METRICS_TOKEN to require `Authorization: Bearer <token>`."""
+    metrics_token = os.getenv("METRICS_TOKEN")
+    if metrics_token and authorization != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Multi-worker mode: aggregate what every worker wrote to the shared directory
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.get("/")
 async def root():
     return {"message": "CIMez API is running"}
@@ -77,25 +246,24 @@ async def preflight_handler(request, rest_of_path: str):
 
 @app.get("/health")
 async def health_check():
-    try:
-        # Test Supabase connection
-        test_response = supabase.table("summaries").select("count", count="exact").execute()
-        return {
-            "status": "healthy", 
-            "message": "API is working",
-            "supabase_connection": "working",
-            "summaries_count": test_response.count if hasattr(test_response, 'count') else "unknown"
-        }
-    except Exception as e:
-        return {
-            "status": "healthy", 
-            "message": "API is working",
-            "supabase_connection": "error",
-            "supabase_error": str(e)
-        }
+    """Liveness plus the last background dependency check; never waits on the network"""
+    snapshot = health_monitor.snapshot()
+    supabase_status = snapshot["dependencies"]["supabase"]
+    response = {
+        "status": "healthy",
+        "message": "API is working",
+        "supabase_connection": supabase_status["status"],
+        "browser": browser_pool.status(),
+        "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
+        "checked_at": snapshot["checked_at"],
+        "check_age_seconds": snapshot["age_seconds"],
+    }
+    if "error" in supabase_status:
+        response["supabase_error"] = supabase_status["error"]
+    return response
 
 async def async_html_to_pdf(output_pdf_path: str, html_file_path: str = "output.html") -> dict:
-    """Asynchronous HTML to PDF conversion using Playwright's Async API"""
+    """Asynchronous HTML to PDF conversion using a page from the shared browser pool"""
     try:
         # Check if HTML file exists
         if not os.path.exists(html_file_path):
@@ -107,24 +275,8 @@ async def async_html_to_pdf(output_pdf_path: str, html_file_path: str = "output.
         
         logger.info(f"Converting HTML to PDF: {html_file_path} -> {output_pdf_path}")
         
-        # Use Playwright's Async API to convert HTML to PDF
         try:
-            async with async_playwright() as p:
-                logger.info("Attempting to launch Chromium browser...")
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--single-process'
-                    ]
-                )
-                logger.info("Browser launched successfully")
-                
-                page = await browser.new_page()
-                logger.info("New page created")
-                
+            async with browser_pool.page() as page:
                 # Use absolute path for file URL
                 abs_html_path = "file://" + os.path.abspath(html_file_path)
                 logger.info(f"Loading HTML from: {abs_html_path}")
@@ -134,22 +286,9 @@ async def async_html_to_pdf(output_pdf_path: str, html_file_path: str = "output.
                 
                 # Generate PDF
                 logger.info("Generating PDF...")
-                await page.pdf(
-                    path=output_pdf_path, 
-                    format='A4', 
-                    print_background=True,
-                    margin={
-                        'top': '20px',
-                        'bottom': '20px', 
-                        'left': '20px',
-                        'right': '20px'
-                    }
-                )
+                await page.pdf(path=output_pdf_path, **PDF_OPTIONS)
                 logger.info("PDF generated successfully")
                 
-                await browser.close()
-                logger.info("Browser closed")
-                
         except Exception as conversion_error:
             logger.error(f"Playwright conversion error: {str(conversion_error)}")
             return {
@@ -198,10 +337,10 @@ def sync_database_insert(summary_data: dict) -> dict:
         }
         
         url = f"{supabase_url}/rest/v1/summaries"
-        response = requests.post(url, headers=headers, json=summary_data, timeout=30)
+        response = requests.post(url, headers=headers, json=compress_row(summary_data), timeout=30)
         
         if response.status_code == 201:
-            response_data = response.json()
+            response_data = decompress_rows(response.json())
             if response_data:
                 return {
                     "success": True,
@@ -221,6 +360,8 @@ def sync_database_insert(summary_data: dict) -> dict:
             "message": f"Database insert failed: {str(e)}"
         }
 
+SUMMARY_LIST_COLUMNS = "id,user_id,original_filename,summary_pdf_url,storage_path,title,created_at"
+
 def sync_database_fetch(user_id: str) -> dict:
     """Synchronous database fetch using direct HTTP to avoid Supabase client issues"""
     try:
@@ -233,7 +374,8 @@ def sync_database_fetch(user_id: str) -> dict:
         }
         
         url = f"{supabase_url}/rest/v1/summaries"
-        params = {"user_id": f"eq.{user_id}", "select": "*"}
+        # Leave out the large text columns; the history list never needs them
+        params = {"user_id": f"eq.{user_id}", "select": SUMMARY_LIST_COLUMNS}
         response = requests.get(url, headers=headers, params=params, timeout=30)
         
         if response.status_code == 200:
@@ -274,7 +416,7 @@ def sync_database_fetch_single(summary_id: str, user_id: str) -> dict:
         response = requests.get(url, headers=headers, params=params, timeout=30)
         
         if response.status_code == 200:
-            response_data = response.json()
+            response_data = decompress_rows(response.json())
             return {
                 "success": True,
                 "data": response_data,
@@ -325,6 +467,77 @@ def sync_database_delete(summary_id: str, user_id: str) -> dict:
             "message": f"Database delete failed: {str(e)}"
         }
 
+def sync_storage_upload(storage_path: str, content: bytes, content_type: str = "application/pdf",
+                        cache_control: Optional[str] = None, upsert: bool = False) -> dict:
+    """Synchronous storage upload using direct HTTP to avoid Supabase client issues"""
+    try:
+        import requests
+        
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": content_type
+        }
+        if cache_control:
+            # Sent back as Cache-Control when the object is downloaded
+            headers["cache-control"] = cache_control
+        if upsert:
+            headers["x-upsert"] = "true"
+        
+        url = f"{supabase_url}/storage/v1/object/summaries/{storage_path}"
+        response = requests.post(url, headers=headers, data=content, timeout=60)
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "public_url": storage_public_url(storage_path),
+                "message": "Storage upload successful"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Storage upload failed: {str(e)}"
+        }
+
+def storage_public_url(storage_path: str) -> str:
+    return f"{supabase_url}/storage/v1/object/public/summaries/{storage_path}"
+
+def sync_storage_download(storage_path: str) -> dict:
+    """Fetch an object from the public summaries bucket; `data` is None if it doesn't exist"""
+    try:
+        import requests
+        
+        response = requests.get(storage_public_url(storage_path), timeout=60)
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "data": response.content,
+                "message": "Storage download successful"
+            }
+        elif response.status_code in (400, 404):
+            # Supabase reports a missing object as 400 with a not_found error
+            return {
+                "success": True,
+                "data": None,
+                "message": "Object not found"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Storage download failed: {str(e)}"
+        }
+
 def sync_storage_delete(storage_path: str) -> dict:
     """Synchronous storage delete using direct HTTP to avoid Supabase client issues"""
     try:
@@ -373,6 +586,205 @@ def sync_storage_delete(storage_path: str) -> dict:
             "message": f"Storage delete failed: {str(e)}"
         }
 
+def sync_database_delete_many(summary_ids: List[str], user_id: str) -> dict:
+    """Delete a user's summaries in one request, returning the deleted rows' storage paths"""
+    try:
+        import requests
+        
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json",
+            "Prefer": "return=representation"
+        }
+        
+        url = f"{supabase_url}/rest/v1/summaries"
+        params = {
+            "id": f"in.({','.join(summary_ids)})",
+            "user_id": f"eq.{user_id}",
+            "select": "id,storage_path,summary_pdf_url"
+        }
+        response = requests.delete(url, headers=headers, params=params, timeout=30)
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "data": response.json(),
+                "message": "Database delete successful"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Database delete failed: {str(e)}"
+        }
+
+def sync_storage_delete_many(storage_paths: List[str]) -> dict:
+    """Delete many objects from the summaries bucket in one request"""
+    try:
+        import requests
+        
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json"
+        }
+        
+        url = f"{supabase_url}/storage/v1/object/summaries"
+        response = requests.delete(url, headers=headers, json={"prefixes": storage_paths}, timeout=60)
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "deleted": [obj["name"] for obj in response.json()],
+                "message": "Storage delete successful"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Storage delete failed: {str(e)}"
+        }
+
+def sync_storage_list(prefix: str, limit: int, offset: int) -> dict:
+    """List one level of the summaries bucket (folders have no id)"""
+    try:
+        import requests
+        
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json"
+        }
+        
+        url = f"{supabase_url}/storage/v1/object/list/summaries"
+        body = {"prefix": prefix, "limit": limit, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+        response = requests.post(url, headers=headers, json=body, timeout=30)
+        
+        if response.status_code == 200:
+            return {
+                "success": True,
+                "data": response.json(),
+                "message": "Storage list successful"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Storage list failed: {str(e)}"
+        }
+
+def sync_database_referenced_paths(storage_paths: List[str]) -> dict:
+    """
+    Which of these storage paths are still referenced by a summaries row, either
+    through `storage_path` or, for older rows without it, through `summary_pdf_url`
+    """
+    try:
+        import requests
+        
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json"
+        }
+        
+        url = f"{supabase_url}/rest/v1/summaries"
+        quoted_paths = ",".join(f'"{path}"' for path in storage_paths)
+        # supabase-py's get_public_url has produced URLs both with and without a trailing "?"
+        quoted_urls = ",".join(
+            f'"{public_url}"' for path in storage_paths
+            for public_url in (storage_public_url(path), storage_public_url(path) + "?")
+        )
+        params = {
+            "or": f"(storage_path.in.({quoted_paths}),summary_pdf_url.in.({quoted_urls}))",
+            "select": "storage_path,summary_pdf_url"
+        }
+        response = requests.get(url, headers=headers, params=params, timeout=30)
+        
+        if response.status_code == 200:
+            referenced = set()
+            for row in response.json():
+                if row.get("storage_path"):
+                    referenced.add(row["storage_path"])
+                url_path = storage_path_from_url(row.get("summary_pdf_url"))
+                if url_path:
+                    referenced.add(url_path)
+            return {
+                "success": True,
+                "data": referenced,
+                "message": "Database fetch successful"
+            }
+        else:
+            raise Exception(f"HTTP {response.status_code}: {response.text}")
+        
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "error_type": str(type(e)),
+            "message": f"Database fetch failed: {str(e)}"
+        }
+
+def storage_path_from_url(public_url: Optional[str]) -> Optional[str]:
+    """The object path in a summaries bucket public URL"""
+    url_parts = (public_url or "").split("?", 1)[0].split("/")
+    if "summaries" in url_parts:
+        summaries_index = url_parts.index("summaries")
+        if summaries_index < len(url_parts) - 1:
+            return "/".join(url_parts[summaries_index + 1:])
+    return None
+
+def storage_path_for(summary: dict) -> Optional[str]:
+    """The object backing a summary; rows without `storage_path` fall back to parsing the public URL"""
+    if summary.get("storage_path"):
+        return summary["storage_path"]
+    return storage_path_from_url(summary.get("summary_pdf_url"))
+
+# Thumbnails live in their own top-level folder (thumbnails/{user_id}/{file}.png);
+# the orphan sweeper removes them once their PDF is no longer referenced
+THUMBNAIL_PREFIX = "thumbnails/"
+# A summary PDF never changes once uploaded, so neither does its stored thumbnail
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Responses from /thumbnails stop being reused soon after their summary is deleted
+THUMBNAIL_RESPONSE_CACHE_CONTROL = "public, max-age=300"
+# Remembers which thumbnails are already in storage so repeat views skip the lookup
+THUMBNAIL_STATE_TTL = 5 * 60
+THUMBNAIL_STATE_MAX_ENTRIES = 10000
+SUMMARY_PDF_PATH = re.compile(r"^[A-Za-z0-9_-]+/[A-Za-z0-9_-]+\.pdf$")
+
+def thumbnail_path_for(storage_path: str) -> str:
+    return f"{THUMBNAIL_PREFIX}{storage_path[:-len('.pdf')]}.png"
+
+def sync_store_thumbnail(storage_path: str, pdf_bytes: bytes) -> bytes:
+    """Render a summary PDF's first page and upload it next to the other thumbnails"""
+    thumbnail = render_thumbnail(pdf_bytes, THUMBNAIL_WIDTH)
+    upload_result = sync_storage_upload(
+        thumbnail_path_for(storage_path), thumbnail, "image/png",
+        cache_control=THUMBNAIL_CACHE_CONTROL, upsert=True
+    )
+    if not upload_result["success"]:
+        raise Exception(upload_result["message"])
+    shared_state.set("thumbnails", storage_path, {"stored": True}, THUMBNAIL_STATE_TTL, THUMBNAIL_STATE_MAX_ENTRIES)
+    return thumbnail
+
+# Removes storage objects left behind by failed uploads or failed storage deletes
+orphan_sweeper = OrphanSweeper(
+    shared_state, sync_storage_list, sync_database_referenced_paths, sync_storage_delete_many,
+    thumbnail_prefix=THUMBNAIL_PREFIX.rstrip("/")
+)
+
 async def get_current_user(authorization: Optional[str] = Header(None)):
     logger.info(f"get_current_user called with authorization: {authorization is not None}")
     
@@ -384,7 +796,8 @@ async def get_current_user(authorization: Optional[str] = Header(None)):
     logger.info(f"Extracted token length: {len(token) if token else 0}")
     
     try:
-        user_response = supabase.auth.get_user(token)
+        with stage_timer("auth"):
+            user_response = get_supabase().auth.get_user(token)
         logger.info(f"Auth response type: {type(user_response)}")
         logger.info(f"User object type: {type(user_response.user)}")
         logger.info(f"User ID: {user_response.user.id}")
@@ -410,148 +823,281 @@ async def debug_summaries(current_user: dict = Depends(get_current_user)):
     try:
         user_id = current_user['id']
         # Fetch summaries for the user
-        response = supabase.table("summaries").select("*").eq("user_id", user_id).execute()
+        response = get_supabase().table("summaries").select("*").eq("user_id", user_id).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
-@app.post("/convert-pdf")
-async def convert_pdf(
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
-):
+async def process_pdf(user_id: str, filename: str, content: bytes, on_stage=None) -> dict:
     """
-    This endpoint does the following:
-    1.  Receives a PDF file.
-    2.  Runs an external Python script (`process_with_openai.py`) to:
-        a. Extract text from the PDF.
-        b. Send the text to OpenAI for processing (summarization, etc.).
-        c. Save the result as an HTML file (`output.html`).
-    3.  Converts the resulting `output.html` to a new PDF.
-    4.  Stores this new PDF in Supabase Storage.
-    5.  Stores metadata about the summary in the Supabase `summaries` table.
-    6.  Returns the public URL of the stored PDF and its summary ID.
+    Run the ingest pipeline for one uploaded CIM:
+    1.  Extracts page-tagged text from the PDF.
+    2.  Sends the text to OpenAI to write the HTML brief (see `prompt.txt`), and
+        meanwhile extracts a cited fact sheet (digest) that `/chat-pdf` answers
+        common questions from and makes sure the browser is up.
+    3.  Converts the HTML brief to a new PDF and compacts it with PyMuPDF.
+    4.  Stores this new PDF and its first-page thumbnail in Supabase Storage,
+        then stores metadata, extracted text and digest in the Supabase
+        `summaries` table. If the insert fails the stored files are removed.
+    5.  Returns the public URL of the stored PDF and its summary ID.
+
+    The steps run as a DAG (see `app/pipeline.py`), each as soon as its inputs
+    are ready. All intermediate files live in the job's own temporary directory,
+    so any number of these can run at once. `on_stage` is called with the name of
+    each stage as it starts. Failures raise HTTPException.
     """
-    user_id = current_user.id
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Could not verify user.")
+    def stage(name: str):
+        logger.info(f"[{filename}] Stage: {name}")
+        if on_stage:
+            on_stage(name)
+
+    openai_client = get_openai_client()
+    if openai_client is None:
+        raise HTTPException(status_code=500, detail="OpenAI API key not configured")
 
+    with JOBS_IN_FLIGHT.labels("convert").track_inprogress():
+        return await _run_pipeline(user_id, filename, content, openai_client, stage)
+
+# Progress labels reported through `on_stage` for the steps that have one
+STAGE_LABELS = {
+    "extract": "extracting",
+    "summarize": "summarizing",
+    "render": "rendering",
+    "storage_upload": "uploading",
+    "db_insert": "saving",
+}
+
+async def _run_pipeline(user_id: str, filename: str, content: bytes, openai_client, stage) -> dict:
     # Use a temporary directory for all file operations
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_dir_path = Path(temp_dir)
-        original_pdf_path = temp_dir_path / file.filename
+        original_pdf_path = temp_dir_path / Path(filename or "upload.pdf").name
         
         # Save the uploaded PDF to the temp directory
         with open(original_pdf_path, "wb") as buffer:
-            content = await file.read()
             buffer.write(content)
         
         # Define paths for output files
-        output_html_path = Path("output.html") # Script writes to project root
+        output_html_path = temp_dir_path / "output.html"
         output_pdf_path = temp_dir_path / f"output_{uuid.uuid4()}.pdf"
-        
-        # --- Run the OpenAI processing script ---
-        script_path = UTILS_DIR / "process_with_openai.py"
-        process = None
-        try:
-            # We run this in a separate process to handle its dependencies and environment
-            logger.info(f"Running OpenAI processing script for: {original_pdf_path}")
-            process = await asyncio.create_subprocess_exec(
-                "python", str(script_path), str(original_pdf_path),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
+        # Known up front so the thumbnail can be stored alongside the PDF
+        storage_file_path = f"{user_id}/{uuid.uuid4()}.pdf"
 
-            if process.returncode != 0:
-                logger.error("OpenAI processing script failed.")
-                logger.error(f"Stderr: {stderr.decode()}")
-                raise HTTPException(status_code=500, detail=f"Failed to process PDF with OpenAI: {stderr.decode()}")
-            
-            logger.info(f"OpenAI processing script stdout: {stdout.decode()}")
-            if stderr:
-                logger.warning(f"OpenAI processing stderr: {stderr.decode()}")
-        
-        except Exception as e:
-            logger.error(f"Error executing subprocess: {e}")
-            raise HTTPException(status_code=500, detail=str(e))
-        
-        # --- Convert the resulting HTML to PDF ---
-        logger.info("Converting HTML to PDF...")
-        conversion_result = await async_html_to_pdf(
-            output_pdf_path=str(output_pdf_path),
-            html_file_path=str(output_html_path)
-        )
-        
-        if not conversion_result.get("success"):
-            logger.error(f"HTML to PDF conversion failed: {conversion_result.get('error')}")
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to convert summary to PDF: {conversion_result.get('error')}"
-            )
-        
-        logger.info(f"Successfully converted HTML to PDF: {output_pdf_path} (size: {conversion_result.get('pdf_size')})")
-        
-        # --- Store PDF in Supabase Storage and metadata in DB ---
-        storage_filename = f"{uuid.uuid4()}.pdf"
-        storage_file_path = f"{user_id}/{storage_filename}"
-        public_url = None
-        
-        try:
-            # Read the generated PDF content
-            with open(output_pdf_path, 'rb') as f:
-                pdf_content = f.read()
-            logger.info(f"Read {len(pdf_content)} bytes from generated PDF.")
-            
-            # 1. Upload to Storage
-            logger.info(f"Uploading to Supabase Storage at path: {storage_file_path}")
-            supabase.storage.from_("summaries").upload(
-                path=storage_file_path,
-                file=pdf_content,
-                file_options={"content-type": "application/pdf"}
+        async def extract() -> str:
+            try:
+                text_blocks = await asyncio.to_thread(extract_text_from_pdf, str(original_pdf_path))
+                page_count = await asyncio.to_thread(get_page_count, str(original_pdf_path))
+            except Exception as e:
+                logger.error(f"Text extraction failed for {filename}: {e}")
+                raise HTTPException(status_code=400, detail=f"Could not read PDF: {str(e)}")
+            observe_pdf("upload", len(content), page_count)
+            page_text = format_text_blocks(text_blocks)
+            logger.info(f"Extracted {len(page_text)} characters from {len(text_blocks)} of {page_count} pages")
+            return page_text
+
+        async def summarize(extract: str) -> str:
+            try:
+                prompt = await asyncio.to_thread(load_prompt)
+                return await asyncio.to_thread(summarize_text, openai_client, extract, prompt)
+            except Exception as e:
+                logger.error(f"OpenAI processing failed: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to process PDF with OpenAI: {str(e)}")
+
+        async def digest(extract: str) -> Optional[dict]:
+            return await asyncio.to_thread(build_digest, openai_client, extract)
+
+        async def warm_browser():
+            # Make sure Chromium is up (e.g. after a crash) while the LLM is still writing
+            await browser_pool.warm()
+
+        async def render(summarize: str, warm_browser) -> bytes:
+            with open(output_html_path, "w", encoding="utf-8") as f:
+                f.write(summarize)
+            conversion_result = await async_html_to_pdf(
+                output_pdf_path=str(output_pdf_path),
+                html_file_path=str(output_html_path)
             )
-            logger.info("Successfully uploaded to Supabase storage.")
+            if not conversion_result.get("success"):
+                logger.error(f"HTML to PDF conversion failed: {conversion_result.get('error')}")
+                raise HTTPException(
+                    status_code=500, 
+                    detail=f"Failed to convert summary to PDF: {conversion_result.get('error')}"
+                )
+            logger.info(f"Successfully converted HTML to PDF: {output_pdf_path} (size: {conversion_result.get('pdf_size')})")
+            return await asyncio.to_thread(output_pdf_path.read_bytes)
+
+        async def optimize(render: bytes) -> bytes:
+            try:
+                pdf_content = await asyncio.to_thread(optimize_pdf_bytes, render)
+            except Exception as e:
+                # Optimization is best effort; the rendered PDF is still valid
+                logger.warning(f"PDF optimization failed, storing the rendered PDF as-is: {str(e)}")
+                pdf_content = render
+            saved = len(render) - len(pdf_content)
+            BYTES_SAVED.labels("pdf").inc(saved)
+            logger.info(f"Optimized summary PDF: {len(render)} -> {len(pdf_content)} bytes ({saved} saved)")
+            with open(output_pdf_path, "wb") as f:
+                f.write(pdf_content)
+            observe_pdf("summary", len(pdf_content), await asyncio.to_thread(get_page_count, str(output_pdf_path)))
+            return pdf_content
+
+        async def storage_upload(optimize: bytes) -> str:
+            logger.info(f"Uploading {len(optimize)} bytes to Supabase Storage at path: {storage_file_path}")
+            upload_result = await asyncio.to_thread(sync_storage_upload, storage_file_path, optimize)
+            if not upload_result.get("success"):
+                raise HTTPException(status_code=500, detail=f"Storage or database error: {upload_result.get('message')}")
+            logger.info(f"Successfully uploaded to Supabase storage: {upload_result['public_url']}")
+            return upload_result["public_url"]
 
-            # 2. Get Public URL
-            public_url = supabase.storage.from_("summaries").get_public_url(storage_file_path)
-            logger.info(f"Generated public URL: {public_url}")
+        async def undo_storage_upload(public_url: str):
+            logger.info(f"Attempting to clean up failed upload at: {storage_file_path}")
+            delete_result = await asyncio.to_thread(sync_storage_delete, storage_file_path)
+            if not delete_result["success"]:
+                # Left for the orphan sweeper, which removes objects no row references
+                record_stage_error("undo_storage_upload")
+                logger.error(f"Could not remove uploaded PDF {storage_file_path}: {delete_result['message']}")
 
-            # 3. Store Metadata in Database
+        async def thumbnail(optimize: bytes) -> bool:
+            try:
+                await asyncio.to_thread(sync_store_thumbnail, storage_file_path, optimize)
+                return True
+            except Exception as e:
+                # Best effort; the history view renders it on first request instead
+                logger.warning(f"Thumbnail generation failed for {storage_file_path}: {str(e)}")
+                return False
+
+        async def undo_thumbnail(stored: bool):
+            if not stored:
+                return
+            delete_result = await asyncio.to_thread(sync_storage_delete, thumbnail_path_for(storage_file_path))
+            if not delete_result["success"]:
+                # Left for the orphan sweeper, which removes thumbnails of unreferenced PDFs
+                record_stage_error("undo_thumbnail")
+                logger.error(f"Could not remove thumbnail for {storage_file_path}: {delete_result['message']}")
+
+        async def db_insert(extract: str, digest: Optional[dict], storage_upload: str) -> dict:
             summary_data = {
                 "user_id": user_id,
-                "original_filename": file.filename,
-                "summary_pdf_url": public_url,
+                "original_filename": filename,
+                "summary_pdf_url": storage_upload,
                 "storage_path": storage_file_path,
-                "title": f"Summary for {file.filename}",
+                "title": f"Summary for {filename}",
+                "extracted_text": extract,
+                "digest": digest,
                 "created_at": datetime.utcnow().isoformat()
             }
-            
             logger.info("Inserting summary metadata into database...")
-            db_response = sync_database_insert(summary_data)
-            
+            db_response = await asyncio.to_thread(sync_database_insert, summary_data)
             if not db_response.get("success"):
-                raise Exception(f"Database insert failed: {db_response.get('error')}")
-
-            db_response_data = db_response.get("data", {})
+                raise HTTPException(
+                    status_code=500,
+                    detail=f"Storage or database error: Database insert failed: {db_response.get('error')}"
+                )
             logger.info("Successfully stored summary metadata.")
-            
-            return {
-                "message": "PDF processed successfully",
-                "summary_id": db_response_data.get("id"),
-                "public_url": public_url
-            }
+            return db_response.get("data", {})
+
+        async def undo_db_insert(row: dict):
+            logger.info(f"Removing summary row {row.get('id')} after the pipeline was cancelled")
+            delete_result = await asyncio.to_thread(sync_database_delete, row.get("id"), user_id)
+            if not delete_result["success"]:
+                record_stage_error("undo_db_insert")
+                logger.error(f"Could not remove summary row {row.get('id')}: {delete_result['message']}")
 
+        def on_start(step_name: str):
+            if step_name in STAGE_LABELS:
+                stage(STAGE_LABELS[step_name])
+
+        # The digest and browser warm-up overlap the summary call and the thumbnail
+        # overlaps the upload. The row is only inserted once the PDF is stored, so a
+        # failed cleanup can leave an unreferenced object (which the orphan sweeper
+        # collects) but never a row pointing at a missing PDF
+        steps = [
+            Step("extract", extract),
+            Step("summarize", summarize, after=("extract",)),
+            Step("digest", digest, after=("extract",)),
+            Step("warm_browser", warm_browser),
+            Step("render", render, after=("summarize", "warm_browser")),
+            Step("optimize", optimize, after=("render",)),
+            Step("storage_upload", storage_upload, after=("optimize",), undo=undo_storage_upload, shielded=True),
+            Step("db_insert", db_insert, after=("extract", "digest", "storage_upload"), undo=undo_db_insert, shielded=True),
+            Step("thumbnail", thumbnail, after=("optimize",), undo=undo_thumbnail, shielded=True),
+        ]
+        try:
+            results = await run_dag(steps, on_start)
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"An error occurred during Supabase operation: {str(e)}")
-            # Attempt to clean up the uploaded file if the DB insert fails
-            if public_url:
-                logger.info(f"Attempting to clean up failed upload at: {storage_file_path}")
-                sync_storage_delete(storage_file_path)
-            raise HTTPException(status_code=500, detail=f"Storage or database error: {str(e)}")
-        finally:
-            # Clean up the local output.html file
-            if os.path.exists(output_html_path):
-                os.remove(output_html_path)
+            logger.error(f"Pipeline failed for {filename}: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to process PDF: {str(e)}")
+
+        return {
+            "message": "PDF processed successfully",
+            "summary_id": results["db_insert"].get("id"),
+            "public_url": results["storage_upload"]
+        }
+
+@app.post("/convert-pdf")
+async def convert_pdf(
+    file: UploadFile = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """Summarize one uploaded CIM and return its summary ID and public URL (see `process_pdf`)."""
+    user_id = current_user.id
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Could not verify user.")
+
+    content = await file.read()
+    return await process_pdf(user_id, file.filename, content)
+
+@app.post("/convert-pdf/batch", status_code=202)
+async def convert_pdf_batch(
+    files: List[UploadFile] = File(...),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Queue many CIMs at once, as PDFs and/or zip archives of PDFs.
+
+    Byte-identical files are processed once. Documents run concurrently,
+    bounded by BATCH_CONCURRENCY across all batches in a worker. Poll
+    `GET /batches/{batch_id}` for per-file progress and results.
+    """
+    user_id = current_user.id
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Could not verify user.")
+
+    try:
+        uploads = await read_uploads(files)
+        pdfs = await asyncio.to_thread(expand_uploads, uploads)
+    except (BatchError, zipfile.BadZipFile) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    batch, contents = create_batch(user_id, pdfs)
+    await asyncio.to_thread(batches.save, batch)
+    logger.info(f"Queued batch {batch.id} with {len(batch.files)} files ({len(contents)} unique) for user {user_id}")
+
+    async def run_tracked():
+        with JOBS_IN_FLIGHT.labels("batch").track_inprogress():
+            await run_batch(
+                batch,
+                contents,
+                lambda filename, content, on_stage: process_pdf(user_id, filename, content, on_stage),
+                batch_semaphore,
+                on_change=batches.save_later
+            )
+
+    task = asyncio.create_task(run_tracked())
+    # Keep a reference so the task isn't garbage collected mid-run
+    background_jobs.add(task)
+    task.add_done_callback(background_jobs.discard)
+
+    return batch.to_dict()
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, user = Depends(get_current_user)):
+    batch = await asyncio.to_thread(batches.get, batch_id, user.id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict()
 
 @app.get("/summaries", response_model=List[CIMSummary])
 async def get_summaries(user = Depends(get_current_user)):
@@ -570,81 +1116,78 @@ async def get_summaries(user = Depends(get_current_user)):
             raise Exception(db_result["message"])
         
         logger.info(f"Successfully fetched {len(db_result['data'])} summaries")
+        for summary in db_result["data"]:
+            # The history view builds thumbnail URLs from it, so fill it in for older rows
+            summary["storage_path"] = storage_path_for(summary)
         return db_result["data"]
         
     except Exception as e:
         logger.error(f"Error fetching summaries: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Most summaries one bulk delete request may remove
+MAX_BULK_DELETE = 100
+
+def forget_summaries(summary_ids: List[str], pdf_paths: List[str]):
+    """Drop everything the shared state holds for deleted summaries"""
+    for summary_id in summary_ids:
+        prompt_prefixes.invalidate(summary_id)
+        chat_sessions.delete_for_document(summary_id)
+    for path in pdf_paths:
+        shared_state.delete("thumbnails", path)
+
+async def delete_summaries_for_user(summary_ids: List[str], user_id: str) -> dict:
+    """
+    Delete summaries and their PDFs in two round trips however many there are:
+    the rows are deleted first (which returns their `storage_path`), then all
+    their objects in one storage request. A failed storage delete leaves
+    orphaned objects, which the background sweeper removes later.
+    """
+    # Only well-formed IDs go into the PostgREST filter; anything else cannot exist
+    valid_ids = []
+    for summary_id in summary_ids:
+        try:
+            valid_ids.append(str(uuid.UUID(summary_id)))
+        except ValueError:
+            continue
+
+    rows = []
+    if valid_ids:
+        with stage_timer("delete_db"):
+            delete_result = await asyncio.to_thread(sync_database_delete_many, valid_ids, user_id)
+        if not delete_result["success"]:
+            record_stage_error("delete_db")
+            logger.error(f"Failed to delete summaries from database: {delete_result['message']}")
+            raise Exception(delete_result["message"])
+        rows = delete_result["data"]
+
+    pdf_paths = [path for path in (storage_path_for(row) for row in rows) if path]
+    await asyncio.to_thread(forget_summaries, [row["id"] for row in rows], pdf_paths)
+    # Missing thumbnails are simply skipped by the bulk delete
+    storage_paths = pdf_paths + [thumbnail_path_for(path) for path in pdf_paths if SUMMARY_PDF_PATH.match(path)]
+    if storage_paths:
+        logger.info(f"Deleting {len(storage_paths)} storage files")
+        with stage_timer("delete_storage"):
+            storage_result = await asyncio.to_thread(sync_storage_delete_many, storage_paths)
+        if not storage_result["success"]:
+            record_stage_error("delete_storage")
+            logger.warning(f"Failed to delete storage files, leaving them to the orphan sweeper: {storage_result['message']}")
+
+    deleted_ids = {row["id"] for row in rows}
+    return {
+        "deleted": [row["id"] for row in rows],
+        "not_found": [summary_id for summary_id in summary_ids if summary_id not in deleted_ids]
+    }
+
 @app.delete("/summaries/{summary_id}")
 async def delete_summary(summary_id: str, user = Depends(get_current_user)):
     try:
         logger.info(f"Deleting summary {summary_id} for user {user.id}")
-        
-        # Get the summary to find the PDF path using thread executor
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(sync_database_fetch_single, summary_id, user.id)
-            fetch_result = future.result(timeout=30)
-        
-        if not fetch_result["success"]:
-            logger.error(f"Failed to fetch summary for deletion: {fetch_result['message']}")
-            raise Exception(fetch_result["message"])
-        
-        if not fetch_result["data"]:
+        result = await delete_summaries_for_user([summary_id], user.id)
+        if not result["deleted"]:
             logger.warning(f"Summary {summary_id} not found for user {user.id}")
             raise HTTPException(status_code=404, detail="Summary not found")
-        
-        summary = fetch_result["data"][0]
-        logger.info(f"Found summary to delete: {summary['title']}")
-        
-        # Delete the PDF from storage
-        # Extract the storage path from the summary_pdf_url
-        # The URL format is typically: https://...supabase.co/storage/v1/object/public/summaries/{user_id}/{filename}
-        pdf_url = summary["summary_pdf_url"]
-        logger.info(f"Attempting to extract storage path from URL: {pdf_url}")
-        
-        url_parts = pdf_url.split("/")
-        logger.info(f"URL parts: {url_parts}")
-        
-        # Find the 'summaries' part in the URL and get everything after it
-        storage_path = None
-        try:
-            summaries_index = url_parts.index("summaries")
-            if summaries_index < len(url_parts) - 1:
-                # Get everything after 'summaries' - should be user_id/filename
-                storage_path = "/".join(url_parts[summaries_index + 1:])
-                logger.info(f"Extracted storage path: {storage_path}")
-        except ValueError:
-            logger.error(f"Could not find 'summaries' in URL parts: {url_parts}")
-        
-        if storage_path:
-            logger.info(f"Deleting storage file: {storage_path}")
-            
-            # Delete from storage using thread executor
-            with ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(sync_storage_delete, storage_path)
-                storage_result = future.result(timeout=30)
-            
-            logger.info(f"Storage deletion result: {storage_result}")
-            
-            if not storage_result["success"]:
-                logger.warning(f"Failed to delete storage file: {storage_result['message']}")
-                # Continue with database deletion even if storage fails
-            else:
-                logger.info(f"Successfully deleted storage file: {storage_path}")
-        else:
-            logger.warning(f"Could not extract storage path from URL: {pdf_url}")
-        
-        # Delete the summary record using thread executor
-        logger.info("Deleting summary from database")
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(sync_database_delete, summary_id, user.id)
-            delete_result = future.result(timeout=30)
-        
-        if not delete_result["success"]:
-            logger.error(f"Failed to delete summary from database: {delete_result['message']}")
-            raise Exception(delete_result["message"])
-        
+
         logger.info(f"Successfully deleted summary {summary_id}")
         return {"message": "Summary deleted successfully"}
         
@@ -654,111 +1197,191 @@ async def delete_summary(summary_id: str, user = Depends(get_current_user)):
         logger.error(f"Error deleting summary: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/summaries/bulk-delete")
+async def bulk_delete_summaries(request: BulkDeleteRequest, user = Depends(get_current_user)):
+    """Delete up to MAX_BULK_DELETE summaries; returns which IDs were deleted and which were not found."""
+    if len(request.summary_ids) > MAX_BULK_DELETE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_DELETE} summaries can be deleted at once")
+    try:
+        logger.info(f"Bulk deleting {len(request.summary_ids)} summaries for user {user.id}")
+        result = await delete_summaries_for_user(request.summary_ids, user.id)
+        logger.info(f"Deleted {len(result['deleted'])} summaries, {len(result['not_found'])} not found")
+        return result
+    except Exception as e:
+        logger.error(f"Error bulk deleting summaries: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/thumbnails/{storage_path:path}")
+async def get_thumbnail(storage_path: str):
+    """
+    First-page preview of a summary PDF, addressed by the PDF's storage path.
+    It isn't behind auth so the history view can use it as an <img> src; like
+    the PDF itself it is only reachable through its unguessable path.
+    Thumbnails recently seen in storage are served from there by a short-lived
+    redirect; otherwise the stored one is returned, or one is rendered and
+    stored if a summary still references the PDF.
+    """
+    if not SUMMARY_PDF_PATH.match(storage_path):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    thumbnail_path = thumbnail_path_for(storage_path)
+    cache_headers = {"Cache-Control": THUMBNAIL_RESPONSE_CACHE_CONTROL}
+
+    if await asyncio.to_thread(shared_state.get, "thumbnails", storage_path):
+        return RedirectResponse(storage_public_url(thumbnail_path), status_code=302, headers=cache_headers)
+
+    stored = await asyncio.to_thread(sync_storage_download, thumbnail_path)
+    if stored["success"] and stored["data"] is not None:
+        await asyncio.to_thread(
+            shared_state.set, "thumbnails", storage_path, {"stored": True}, THUMBNAIL_STATE_TTL, THUMBNAIL_STATE_MAX_ENTRIES
+        )
+        return Response(content=stored["data"], media_type="image/png", headers=cache_headers)
+
+    # Never render for a deleted summary; a thumbnail stored just before its summary
+    # is deleted is still removed later by the orphan sweeper
+    referenced = await asyncio.to_thread(sync_database_referenced_paths, [storage_path])
+    if not referenced["success"]:
+        logger.error(f"Could not look up {storage_path} for its thumbnail: {referenced['message']}")
+        raise HTTPException(status_code=500, detail=referenced["message"])
+    if storage_path not in referenced["data"]:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    pdf_result = await asyncio.to_thread(sync_storage_download, storage_path)
+    if not pdf_result["success"]:
+        logger.error(f"Could not fetch {storage_path} for its thumbnail: {pdf_result['message']}")
+        raise HTTPException(status_code=500, detail=pdf_result["message"])
+    if pdf_result["data"] is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    try:
+        with stage_timer("thumbnail"):
+            thumbnail = await asyncio.to_thread(sync_store_thumbnail, storage_path, pdf_result["data"])
+    except Exception as e:
+        logger.error(f"Thumbnail generation failed for {storage_path}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Thumbnail generation failed: {str(e)}")
+    return Response(content=thumbnail, media_type="image/png", headers=cache_headers)
+
 @app.post("/chat-pdf")
 async def chat_with_pdf(
     request: ChatRequest,
+    background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user)
 ):
     """
-    Chat with a processed PDF document using the original PDF text content
+    Chat with a processed PDF document using the original PDF text content.
+
+    Conversations are kept server-side: pass back the returned `session_id` to
+    continue one. Older turns are folded into a rolling summary so the prompt
+    stays bounded, and the document prompt is sent first and unchanged on every
+    turn so the provider can reuse its prompt cache.
     """
+    with JOBS_IN_FLIGHT.labels("chat").track_inprogress():
+        return await _chat_turn(request, background_tasks, current_user)
+
+async def _chat_turn(request: ChatRequest, background_tasks: BackgroundTasks, current_user) -> dict:
     try:
         logger.info(f"Chat request for document {request.document_id} by user {current_user.id}")
-        
-        # First, verify the user owns this document
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            future = executor.submit(sync_database_fetch_single, request.document_id, current_user.id)
-            fetch_result = future.result(timeout=30)
-        
-        if not fetch_result["success"] or not fetch_result["data"]:
-            logger.warning(f"Document {request.document_id} not found for user {current_user.id}")
-            raise HTTPException(status_code=404, detail="Document not found")
-        
-        document = fetch_result["data"][0]
-        logger.info(f"User verified for document: {document['title']}")
-        
-        # Get the extracted text content from the document
-        extracted_text = document.get('extracted_text', '')
-        if not extracted_text:
-            logger.warning(f"No extracted text found for document {request.document_id} - falling back to basic mode")
-            # Fall back to basic chat without document content
-            system_prompt = f"""You are an AI assistant helping users understand a document titled "{document['title']}". 
-            
-            I apologize, but the full document content is not available for this document. This may be because it was processed before the text extraction feature was added.
-            
-            I can provide general assistance about the document based on its title and filename, but I cannot reference specific content.
-            
-            Document title: {document['title']}
-            Original filename: {document['original_filename']}
-            
-            Please let me know how I can help you with this document."""
-            
-            truncated_text = ""  # No content available
-        else:
-            logger.info(f"Using {len(extracted_text)} characters of original document text for context")
-            
-            # Create a comprehensive prompt that includes the full document text
-            # Truncate text if it's too long for the API (keep last part which is usually most relevant)
-            max_context_length = 24000  # Leave room for question and system prompt
-            if len(extracted_text) > max_context_length:
-                # Keep the first part and last part of the document
-                first_part = extracted_text[:max_context_length//2]
-                last_part = extracted_text[-(max_context_length//2):]
-                truncated_text = f"{first_part}\n\n[... middle content truncated ...]\n\n{last_part}"
-                logger.info(f"Truncated document text from {len(extracted_text)} to {len(truncated_text)} characters")
-            else:
-                truncated_text = extracted_text
-            
-            system_prompt = f"""You are an AI assistant helping users understand a document titled "{document['title']}". 
-            
-            You have access to the FULL ORIGINAL TEXT CONTENT of this document below. Use this content to answer questions accurately and in detail.
-            
-            Be helpful, accurate, and specific. You can reference specific sections, quote relevant passages, and provide detailed explanations based on the document content.
-            
-            If the user asks about something not covered in the document, clearly state that the information is not available in this document.
-            
-            Document title: {document['title']}
-            Original filename: {document['original_filename']}
-            
-                         DOCUMENT CONTENT:
-             {truncated_text}
-             """
-        
+
+        session = None
+        if request.session_id:
+            session = await asyncio.to_thread(chat_sessions.get, request.session_id, current_user.id, request.document_id)
+            if not session:
+                logger.info(f"Chat session {request.session_id} not found or expired - starting a new one")
+
+        # An existing session already proved ownership, so a cached prompt can skip the DB round trip
+        cached = await asyncio.to_thread(prompt_prefixes.get, request.document_id) if session else None
+        if cached is None:
+            with stage_timer("chat_lookup"):
+                fetch_result = await asyncio.to_thread(sync_database_fetch_single, request.document_id, current_user.id)
+
+            if not fetch_result["success"] or not fetch_result["data"]:
+                logger.warning(f"Document {request.document_id} not found for user {current_user.id}")
+                raise HTTPException(status_code=404, detail="Document not found")
+
+            document = fetch_result["data"][0]
+            logger.info(f"User verified for document: {document['title']}")
+            if not document.get('extracted_text'):
+                logger.warning(f"No extracted text found for document {request.document_id} - falling back to basic mode")
+
+            cached = {
+                "title": document['title'],
+                "original_filename": document['original_filename'],
+                "prefix": build_document_prefix(document),
+                "digest_prefix": build_digest_prefix(document)
+            }
+            await asyncio.to_thread(prompt_prefixes.put, request.document_id, cached)
+
+        if not session:
+            session = await asyncio.to_thread(chat_sessions.create, current_user.id, request.document_id)
+
         # Use OpenAI to answer the question about the document
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        
-        if not openai_api_key:
+        client = get_openai_client()
+
+        if client is None:
             raise HTTPException(status_code=500, detail="OpenAI API key not configured")
-        
+
+        async def ask(prefix: str, stage: str) -> str:
+            messages = build_messages(prefix, session, request.question)
+            with stage_timer(stage):
+                response = await asyncio.to_thread(
+                    client.chat.completions.create,
+                    model="gpt-4.1-nano",
+                    messages=messages
+                )
+            if getattr(response, "usage", None):
+                logger.info(f"Chat turn used {response.usage.prompt_tokens} prompt tokens across {len(messages)} messages")
+            return response.choices[0].message.content
+
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=openai_api_key)
-            
-            response = client.chat.completions.create(
-                model="gpt-4.1-nano",  # Use 16k model for longer context
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": request.question}]
-              # Lower temperature for more accurate responses
-            )
-            
-            answer = response.choices[0].message.content
-            
+            # Most questions are answered from the small fact sheet; go to the full text only on a miss
+            answer = None
+            if cached.get("digest_prefix"):
+                answer = await ask(cached["digest_prefix"], "chat_digest")
+                if is_digest_miss(answer):
+                    logger.info("Digest could not answer question - falling back to full document text")
+                    answer = None
+            if answer is None:
+                answer = await ask(cached["prefix"], "chat_full_text")
+
         except Exception as openai_error:
             logger.error(f"OpenAI API error: {str(openai_error)}")
-            # Fallback response if OpenAI fails
-            answer = f"I'm sorry, but I'm having trouble accessing the AI service right now. However, I have access to the full content of '{document['title']}' (originally '{document['original_filename']}'). Please try again later or rephrase your question."
-        
+            # Fallback response if OpenAI fails; not recorded in the session
+            answer = f"I'm sorry, but I'm having trouble accessing the AI service right now. However, I have access to the full content of '{cached['title']}' (originally '{cached['original_filename']}'). Please try again later or rephrase your question."
+        else:
+            session = await asyncio.to_thread(
+                chat_sessions.update,
+                session.id,
+                lambda s: s.turns.extend([
+                    {"role": "user", "content": request.question},
+                    {"role": "assistant", "content": answer or ""}
+                ])
+            ) or session
+            if needs_fold(session):
+                background_tasks.add_task(fold_session, chat_sessions, session.id, client)
+
         logger.info(f"Generated response for question: {request.question[:50]}...")
-        
+
         return {
             "answer": answer,
-            "document_title": document['title'],
-            "question": request.question
+            "document_title": cached['title'],
+            "question": request.question,
+            "session_id": session.id
         }
-        
+
     except HTTPException:
         raise  # Re-raise HTTPExceptions as-is
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/chat-sessions/{session_id}")
+async def get_chat_session(session_id: str, user = Depends(get_current_user)):
+    session = await asyncio.to_thread(chat_sessions.get, session_id, user.id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return session.to_dict()
+
+@app.delete("/chat-sessions/{session_id}")
+async def delete_chat_session(session_id: str, user = Depends(get_current_user)):
+    if not await asyncio.to_thread(chat_sessions.delete, session_id, user.id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"message": "Chat session deleted successfully"}
@@ -0,0 +1,130 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stage currently running in this context; LLM token counts are labelled with it
+current_stage = contextvars.ContextVar("current_stage", default="unknown")
+
+STAGE_SECONDS = Histogram(
+    "cim_stage_duration_seconds",
+    "Duration of pipeline stages",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160),
+)
+STAGE_ERRORS = Counter(
+    "cim_stage_errors_total",
+    "Pipeline stage failures",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "cim_llm_tokens_total",
+    "OpenAI tokens used, by stage, model and direction (input/output)",
+    ["stage", "model", "direction"],
+)
+LLM_CALLS = Counter(
+    "cim_llm_calls_total",
+    "OpenAI chat completion calls, by stage, model and outcome",
+    ["stage", "model", "outcome"],
+)
+PDF_PAGES = Histogram(
+    "cim_pdf_pages",
+    "Page counts of uploaded CIMs and generated summaries",
+    ["kind"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 200, 400),
+)
+PDF_BYTES = Histogram(
+    "cim_pdf_bytes",
+    "Sizes of uploaded CIMs and generated summaries",
+    ["kind"],
+    buckets=(1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8),
+)
+JOBS_IN_FLIGHT = Gauge(
+    "cim_jobs_in_flight",
+    "Requests or jobs currently being processed",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+BROWSER_PAGES_IN_USE = Gauge(
+    "cim_browser_pages_in_use",
+    "Browser pool pages currently rendering",
+    multiprocess_mode="livesum",
+)
+BROWSER_PAGES_WAITING = Gauge(
+    "cim_browser_pages_waiting",
+    "Renders waiting for a free browser pool page",
+    multiprocess_mode="livesum",
+)
+BROWSER_LAUNCHES = Counter(
+    "cim_browser_launches_total",
+    "Chromium launches, including relaunches after a crash",
+)
+BYTES_SAVED = Counter(
+    "cim_bytes_saved_total",
+    "Bytes saved by summary PDF optimization and stored text compression",
+    ["kind"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "cim_http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """Time a pipeline stage, count it as an error if it raises, and label LLM usage inside it.
+
+    Cancellation (a failed sibling step or a client that went away) is timed
+    but not counted as an error of this stage.
+    """
+    token = current_stage.set(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+        current_stage.reset(token)
+
+
+def record_stage_error(stage: str):
+    """For stages that report failure through a result dict instead of raising"""
+    STAGE_ERRORS.labels(stage).inc()
+
+
+def observe_pdf(kind: str, size_bytes: int, pages: int = None):
+    PDF_BYTES.labels(kind).observe(size_bytes)
+    if pages is not None:
+        PDF_PAGES.labels(kind).observe(pages)
+
+
+def instrument_openai(client):
+    """Count calls and tokens for every chat completion made through `client`"""
+    completions = client.chat.completions
+    create = completions.create
+
+    def instrumented_create(*args, **kwargs):
+        stage = current_stage.get()
+        model = kwargs.get("model", "unknown")
+        try:
+            response = create(*args, **kwargs)
+        except Exception:
+            LLM_CALLS.labels(stage, model, "error").inc()
+            raise
+        LLM_CALLS.labels(stage, model, "ok").inc()
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.labels(stage, model, "input").inc(usage.prompt_tokens or 0)
+            LLM_TOKENS.labels(stage, model, "output").inc(usage.completion_tokens or 0)
+        return response
+
+    completions.create = instrumented_create
+    return client
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class CIMSummary(BaseModel):
@@ -7,8 +7,10 @@ class CIMSummary(BaseModel):
     user_id: str
     original_filename: str
     summary_pdf_url: str
+    storage_path: Optional[str] = None  # Object path in the summaries bucket; also keys its thumbnail
     title: str
     extracted_text: Optional[str] = None  # Store the original PDF text content
+    digest: Optional[dict] = None  # Cited fact sheet extracted at ingest for fast chat answers
     created_at: Optional[datetime] = None
 
 class User(BaseModel):
@@ -18,4 +20,8 @@ class User(BaseModel):
 
 class ChatRequest(BaseModel):
     question: str
-    document_id: str 
\ No newline at end of file
+    document_id: str
+    session_id: Optional[str] = None  # Continue an existing server-side conversation
+
+class BulkDeleteRequest(BaseModel):
+    summary_ids: List[str]
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Step:
+    """One node of a pipeline DAG.
+
+    `run` is called with the results of the steps named in `after` as keyword
+    arguments, once all of them have finished. If the pipeline fails, `undo` is
+    called with this step's result to reverse its side effects. A `shielded`
+    step is allowed to finish instead of being cancelled when another step
+    fails, so that an external write which may already have happened can still
+    be undone.
+    """
+    name: str
+    run: Callable[..., Awaitable[Any]]
+    after: Tuple[str, ...] = ()
+    undo: Optional[Callable[[Any], Awaitable[None]]] = None
+    shielded: bool = False
+
+
+def _check(steps: List[Step]):
+    names = [step.name for step in steps]
+    if len(set(names)) != len(names):
+        raise ValueError("Pipeline step names must be unique")
+    remaining = {step.name: set(step.after) for step in steps}
+    for step in steps:
+        missing = set(step.after) - remaining.keys()
+        if missing:
+            raise ValueError(f"Step {step.name} depends on unknown steps {sorted(missing)}")
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps & remaining.keys()]
+        if not ready:
+            raise ValueError(f"Pipeline has a dependency cycle among {sorted(remaining)}")
+        for name in ready:
+            remaining.pop(name)
+
+
+async def run_dag(steps: List[Step], on_start: Callable[[str], None] = None) -> Dict[str, Any]:
+    """Run every step as soon as its dependencies are done and return all results by name.
+
+    Each step is timed as a pipeline stage under its own name. On the first
+    failure (or if the caller is cancelled) the remaining steps are cancelled,
+    shielded steps are awaited, completed steps are undone in reverse order of
+    completion and the original exception is re-raised.
+    """
+    _check(steps)
+    pending = list(steps)
+    results: Dict[str, Any] = {}
+    completed: List[Step] = []
+    running: Dict[asyncio.Task, Step] = {}
+    failure: Optional[BaseException] = None
+
+    async def run_step(step: Step):
+        if on_start:
+            on_start(step.name)
+        with stage_timer(step.name):
+            return await step.run(**{dep: results[dep] for dep in step.after})
+
+    try:
+        while pending or running:
+            for step in [s for s in pending if all(dep in results for dep in s.after)]:
+                pending.remove(step)
+                running[asyncio.create_task(run_step(step))] = step
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                step = running.pop(task)
+                if task.exception() is not None:
+                    failure = failure or task.exception()
+                else:
+                    results[step.name] = task.result()
+                    completed.append(step)
+            if failure:
+                break
+    except asyncio.CancelledError as e:
+        failure = e
+
+    if failure is None:
+        return results
+
+    for task, step in running.items():
+        if not step.shielded:
+            task.cancel()
+    outcomes = await asyncio.gather(*running, return_exceptions=True)
+    for step, outcome in zip(running.values(), outcomes):
+        if not isinstance(outcome, BaseException):
+            results[step.name] = outcome
+            completed.append(step)
+
+    for step in reversed(completed):
+        if step.undo:
+            try:
+                await step.undo(results[step.name])
+            except Exception as e:
+                logger.error(f"Undoing pipeline step {step.name} failed: {str(e)}")
+    raise failure
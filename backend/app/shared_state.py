@@ -0,0 +1,312 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# memory:// (single process), sqlite:///path/to/state.db or redis://host:6379/0
+STATE_BACKEND_URL = os.getenv("STATE_BACKEND_URL", "memory://")
+DEFAULT_SQLITE_PATH = os.path.join(tempfile.gettempdir(), "cimreader-state.db")
+
+# Values are JSON-serializable dicts. `mutate` receives the current value (None if
+# missing or expired) and returns the value to store, or None to leave it unchanged.
+Mutate = Callable[[Optional[dict]], Optional[dict]]
+
+# SQLite reads refresh an entry's LRU position at most this often, to avoid a write per read
+LRU_TOUCH_SECONDS = 60
+
+
+class MemoryState:
+    """Process-local state with per-namespace TTL and LRU size caps.
+
+    Values are stored as JSON so callers get copies, exactly as they would from
+    the cross-process backends.
+    """
+
+    shared_across_processes = False
+
+    def __init__(self):
+        self._namespaces: Dict[str, "OrderedDict[str, tuple]"] = {}
+        self._lock = threading.Lock()
+
+    def _entries(self, namespace: str) -> "OrderedDict[str, tuple]":
+        entries = self._namespaces.setdefault(namespace, OrderedDict())
+        now = time.time()
+        for key in [k for k, (expires_at, _) in entries.items() if expires_at is not None and expires_at <= now]:
+            entries.pop(key)
+        return entries
+
+    def _write(self, namespace, key, value, ttl, max_entries):
+        entries = self._entries(namespace)
+        entries[key] = (time.time() + ttl if ttl else None, json.dumps(value))
+        entries.move_to_end(key)
+        while max_entries and len(entries) > max_entries:
+            entries.popitem(last=False)
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        with self._lock:
+            entries = self._entries(namespace)
+            entry = entries.get(key)
+            if not entry:
+                return None
+            entries.move_to_end(key)
+            return json.loads(entry[1])
+
+    def set(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        with self._lock:
+            self._write(namespace, key, value, ttl, max_entries)
+
+    def update(self, namespace: str, key: str, mutate: Mutate, ttl: Optional[float] = None,
+               max_entries: Optional[int] = None) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries(namespace).get(key)
+            current = json.loads(entry[1]) if entry else None
+            new_value = mutate(current)
+            if new_value is None:
+                return current
+            self._write(namespace, key, new_value, ttl, max_entries)
+            return new_value
+
+    def delete(self, namespace: str, key: str) -> bool:
+        with self._lock:
+            return self._entries(namespace).pop(key, None) is not None
+
+    def incr(self, namespace: str, key: str, ttl: Optional[float] = None) -> int:
+        with self._lock:
+            entry = self._entries(namespace).get(key)
+            count = (json.loads(entry[1])["count"] if entry else 0) + 1
+            # Counters keep the expiry they were created with (fixed windows)
+            expires_at = entry[0] if entry else (time.time() + ttl if ttl else None)
+            self._entries(namespace)[key] = (expires_at, json.dumps({"count": count}))
+            return count
+
+
+class SQLiteState:
+    """State shared by all workers on one machine through a SQLite file in WAL mode.
+
+    Each process and thread opens its own connection, so this is safe to create
+    before gunicorn forks its workers.
+    """
+
+    shared_across_processes = True
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " expires_at REAL, updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS shared_state_lru ON shared_state (namespace, updated_at)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front so read-modify-write is atomic across processes
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _read(conn, namespace, key) -> Optional[tuple]:
+        return conn.execute(
+            "SELECT value, expires_at FROM shared_state WHERE namespace = ? AND key = ?"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time())
+        ).fetchone()
+
+    @staticmethod
+    def _write(conn, namespace, key, value, expires_at, max_entries):
+        now = time.time()
+        conn.execute(
+            "INSERT INTO shared_state (namespace, key, value, expires_at, updated_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT (namespace, key) DO UPDATE SET"
+            " value = excluded.value, expires_at = excluded.expires_at, updated_at = excluded.updated_at",
+            (namespace, key, json.dumps(value), expires_at, now)
+        )
+        conn.execute(
+            "DELETE FROM shared_state WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (namespace, now)
+        )
+        if max_entries:
+            conn.execute(
+                "DELETE FROM shared_state WHERE namespace = ? AND key IN ("
+                " SELECT key FROM shared_state WHERE namespace = ? ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, max_entries)
+            )
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, updated_at FROM shared_state WHERE namespace = ? AND key = ?"
+            " AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, now)
+        ).fetchone()
+        if not row:
+            return None
+        if now - row[1] > LRU_TOUCH_SECONDS:
+            # Reads count as use for the max_entries eviction in _write
+            conn.execute(
+                "UPDATE shared_state SET updated_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+            )
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        expires_at = time.time() + ttl if ttl else None
+        self._transaction(lambda conn: self._write(conn, namespace, key, value, expires_at, max_entries))
+
+    def update(self, namespace: str, key: str, mutate: Mutate, ttl: Optional[float] = None,
+               max_entries: Optional[int] = None) -> Optional[dict]:
+        def apply(conn):
+            row = self._read(conn, namespace, key)
+            current = json.loads(row[0]) if row else None
+            new_value = mutate(current)
+            if new_value is None:
+                return current
+            self._write(conn, namespace, key, new_value, time.time() + ttl if ttl else None, max_entries)
+            return new_value
+        return self._transaction(apply)
+
+    def delete(self, namespace: str, key: str) -> bool:
+        cursor = self._connection().execute(
+            "DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, namespace: str, key: str, ttl: Optional[float] = None) -> int:
+        def apply(conn):
+            row = self._read(conn, namespace, key)
+            count = (json.loads(row[0])["count"] if row else 0) + 1
+            expires_at = row[1] if row else (time.time() + ttl if ttl else None)
+            self._write(conn, namespace, key, {"count": count}, expires_at, None)
+            return count
+        return self._transaction(apply)
+
+
+class RedisState:
+    """State shared through Redis (or a compatible server such as Valkey or KeyDB).
+
+    Entries expire by TTL; `max_entries` is not enforced, configure maxmemory-policy
+    on the server instead. Needs the optional `redis` package.
+    """
+
+    shared_across_processes = True
+
+    def __init__(self, url: str, prefix: str = "cim"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+        self._pid = None
+
+    def _redis(self):
+        if self._client is None or self._pid != os.getpid():
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("STATE_BACKEND_URL is a redis:// URL but the redis package is not installed")
+            self._client = redis.Redis.from_url(self.url)
+            self._pid = os.getpid()
+        return self._client
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        raw = self._redis().get(self._key(namespace, key))
+        return json.loads(raw) if raw else None
+
+    def set(self, namespace: str, key: str, value: dict, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self._redis().set(self._key(namespace, key), json.dumps(value), ex=int(ttl) if ttl else None)
+
+    def update(self, namespace: str, key: str, mutate: Mutate, ttl: Optional[float] = None,
+               max_entries: Optional[int] = None) -> Optional[dict]:
+        import redis
+        name = self._key(namespace, key)
+        with self._redis().pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.get(name)
+                    current = json.loads(raw) if raw else None
+                    new_value = mutate(current)
+                    if new_value is None:
+                        pipe.unwatch()
+                        return current
+                    pipe.multi()
+                    pipe.set(name, json.dumps(new_value), ex=int(ttl) if ttl else None)
+                    pipe.execute()
+                    return new_value
+                except redis.WatchError:
+                    # Another worker changed the key between our read and write; retry
+                    continue
+
+    def delete(self, namespace: str, key: str) -> bool:
+        return self._redis().delete(self._key(namespace, key)) > 0
+
+    def incr(self, namespace: str, key: str, ttl: Optional[float] = None) -> int:
+        client = self._redis()
+        name = self._key(namespace, key)
+        count = client.incr(name)
+        if count == 1 and ttl:
+            client.expire(name, int(ttl))
+        return count
+
+
+def create_state(url: str = STATE_BACKEND_URL):
+    if url.startswith("memory://"):
+        return MemoryState()
+    if url.startswith("sqlite://"):
+        return SQLiteState(url[len("sqlite://"):] or DEFAULT_SQLITE_PATH)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(url)
+    raise ValueError(f"Unsupported STATE_BACKEND_URL: {url}")
+
+
+class RateBudget:
+    """A requests-per-window budget shared by every worker using the same state backend"""
+
+    def __init__(self, state, name: str, limit: int, window_seconds: float = 60):
+        self._state = state
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def acquire(self):
+        """Block the calling thread until the current window has room"""
+        while True:
+            window = int(time.time() // self.window_seconds)
+            count = self._state.incr("rate_budget", f"{self.name}:{window}", ttl=self.window_seconds * 2)
+            if count <= self.limit:
+                return
+            wait = (window + 1) * self.window_seconds - time.time()
+            logger.info(f"Rate budget {self.name} exhausted ({self.limit}/{self.window_seconds}s), waiting {wait:.1f}s")
+            time.sleep(max(wait, 0.05))
+
+    def wrap(self, fn):
+        def limited(*args, **kwargs):
+            self.acquire()
+            return fn(*args, **kwargs)
+        return limited
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Callable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How often one worker sweeps the summaries bucket for objects no row points to
+ORPHAN_GC_INTERVAL_SECONDS = float(os.getenv("ORPHAN_GC_INTERVAL_SECONDS", str(60 * 60)))
+# Objects younger than this are skipped: their row may still be being inserted
+ORPHAN_GRACE_SECONDS = float(os.getenv("ORPHAN_GRACE_SECONDS", str(60 * 60)))
+
+LIST_PAGE_SIZE = 1000
+# Paths per bulk storage delete
+CHUNK_SIZE = 100
+# Paths per reference lookup; each one adds its path and two public URLs to the query string
+LOOKUP_CHUNK_SIZE = 20
+
+
+def _chunks(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _age_seconds(created_at: str) -> float:
+    if not created_at:
+        return 0.0
+    return time.time() - datetime.fromisoformat(created_at.replace("Z", "+00:00")).timestamp()
+
+
+class OrphanSweeper:
+    """Deletes storage objects that no `summaries` row references.
+
+    These come from uploads whose cleanup failed, e.g. a crash between the
+    upload and the row insert, or a storage delete that errored after its row
+    was already gone. `referenced_paths` must also match rows that only have a
+    `summary_pdf_url`, or their PDFs would be deleted.
+
+    The bucket is laid out as `{user_id}/{file}.pdf`, with first-page thumbnails
+    at `{thumbnail_prefix}/{user_id}/{file}.png`. A thumbnail belongs to the PDF
+    at the same user and file name and is an orphan when that PDF is. The
+    storage and database calls are passed in as `sync_*` style callables
+    returning `{"success", ...}` dicts.
+    """
+
+    def __init__(self, state,
+                 list_objects: Callable[[str, int, int], dict],
+                 referenced_paths: Callable[[List[str]], dict],
+                 delete_objects: Callable[[List[str]], dict],
+                 interval: float = ORPHAN_GC_INTERVAL_SECONDS,
+                 grace_seconds: float = ORPHAN_GRACE_SECONDS,
+                 thumbnail_prefix: str = "thumbnails"):
+        self._state = state
+        self._list_objects = list_objects
+        self._referenced_paths = referenced_paths
+        self._delete_objects = delete_objects
+        self.interval = interval
+        self.grace_seconds = grace_seconds
+        self.thumbnail_prefix = thumbnail_prefix
+
+    def _list(self, prefix: str) -> Iterator[dict]:
+        offset = 0
+        while True:
+            result = self._list_objects(prefix, LIST_PAGE_SIZE, offset)
+            if not result["success"]:
+                raise Exception(result["message"])
+            yield from result["data"]
+            if len(result["data"]) < LIST_PAGE_SIZE:
+                return
+            offset += LIST_PAGE_SIZE
+
+    def _objects(self) -> Iterator[Tuple[str, str, str]]:
+        """(path, owning PDF path, created_at) for every PDF and thumbnail in the bucket"""
+        for entry in self._list(""):
+            if entry.get("id") is not None:
+                yield entry["name"], entry["name"], entry.get("created_at")
+                continue
+            if entry["name"] == self.thumbnail_prefix:
+                yield from self._thumbnails()
+                continue
+            for child in self._list(entry["name"]):
+                if child.get("id") is not None:
+                    path = f"{entry['name']}/{child['name']}"
+                    yield path, path, child.get("created_at")
+
+    def _thumbnails(self) -> Iterator[Tuple[str, str, str]]:
+        for folder in self._list(self.thumbnail_prefix):
+            if folder.get("id") is not None:
+                continue
+            for child in self._list(f"{self.thumbnail_prefix}/{folder['name']}"):
+                if child.get("id") is None or not child["name"].endswith(".png"):
+                    continue
+                pdf_path = f"{folder['name']}/{child['name'][:-len('.png')]}.pdf"
+                yield f"{self.thumbnail_prefix}/{folder['name']}/{child['name']}", pdf_path, child.get("created_at")
+
+    def sweep(self) -> dict:
+        candidates = [
+            (path, owner) for path, owner, created_at in self._objects()
+            if _age_seconds(created_at) >= self.grace_seconds
+        ]
+
+        referenced: Set[str] = set()
+        for chunk in _chunks(sorted({owner for _, owner in candidates}), LOOKUP_CHUNK_SIZE):
+            result = self._referenced_paths(chunk)
+            if not result["success"]:
+                raise Exception(result["message"])
+            referenced |= result["data"]
+        orphans = [path for path, owner in candidates if owner not in referenced]
+
+        deleted = 0
+        for chunk in _chunks(orphans, CHUNK_SIZE):
+            result = self._delete_objects(chunk)
+            if result["success"]:
+                deleted += len(result["deleted"])
+            else:
+                logger.warning(f"Orphan sweep could not delete {len(chunk)} objects: {result['message']}")
+        return {"scanned": len(candidates), "orphans": len(orphans), "deleted": deleted}
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # One sweep per interval across all workers sharing the state backend
+            window = int(time.time() // self.interval)
+            claimed = await asyncio.to_thread(self._state.incr, "storage_gc", str(window), self.interval * 2)
+            if claimed != 1:
+                continue
+            try:
+                result = await asyncio.to_thread(self.sweep)
+                logger.info(f"Orphan sweep: {result}")
+            except Exception as e:
+                logger.error(f"Orphan sweep failed: {str(e)}")
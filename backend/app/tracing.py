@@ -0,0 +1,41 @@
+import contextvars
+import logging
+import re
+import uuid
+
+TRACE_HEADER = "X-Request-ID"
+
+# Trace ID of the request being handled; copied into tasks and threads started from it
+trace_id = contextvars.ContextVar("trace_id", default="-")
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+
+_VALID_TRACE_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def new_trace_id(incoming: str = None) -> str:
+    """Use the caller's trace ID if it is sane, otherwise mint one"""
+    if incoming and _VALID_TRACE_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex[:16]
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id.get()
+        return True
+
+
+def configure_logging(level=logging.INFO):
+    """Add the trace ID to every log line.
+
+    Other modules may already have called logging.basicConfig, so this adjusts
+    whatever root handlers exist rather than relying on being first.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=level)
+    root.setLevel(level)
+    for handler in root.handlers:
+        handler.addFilter(TraceIdFilter())
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
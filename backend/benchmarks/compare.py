@@ -0,0 +1,50 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare baseline.json candidate.json [--threshold 5]
+
+Prints every numeric metric present in both runs with its relative change;
+changes beyond the threshold (percent) are flagged.
+"""
+import argparse
+import json
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key == "meta":
+                continue
+            yield from flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, list):
+        for item in value:
+            # End-to-end levels are keyed by concurrency rather than position
+            key = f"c{item['concurrency']}" if isinstance(item, dict) and "concurrency" in item else None
+            if key:
+                yield from flatten(item, f"{prefix}.{key}")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=5.0, help="Flag changes larger than this percent")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = dict(flatten(json.load(f)))
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = dict(flatten(json.load(f)))
+
+    print(f"{'metric':<60} {'baseline':>12} {'candidate':>12} {'change':>9}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        change = (after - before) / before * 100 if before else 0.0
+        flag = " *" if abs(change) > args.threshold else ""
+        print(f"{key:<60} {before:>12.4g} {after:>12.4g} {change:>+8.1f}%{flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+A local stand-in for the OpenAI chat completions API.
+
+Latency is modelled as a fixed overhead plus time to read the prompt and
+stream the completion at configurable token rates, so benchmarks exercise the
+same waiting pattern as the real API without cost or rate limits.
+"""
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+
+# Rough size of the HTML brief the real model returns (~900 words)
+SUMMARY_HTML = (
+    "<!DOCTYPE html><html><head><meta charset='utf-8'><style>"
+    "body{font-family:Helvetica,Arial,sans-serif;font-size:10pt;margin:0 24px}"
+    "h2{font-size:12pt;border-bottom:1px solid #999}p.bullet{margin:2px 0 2px 16px}"
+    "</style></head><body><h1>CIM Two-Page Brief</h1>"
+    + "".join(
+        f"<h2>Section {s}</h2>" + "".join(
+            f"<p class='bullet'>* Revenue grew {i + 3}% year over year with adjusted EBITDA margin "
+            f"expanding {10 * i} bps on pricing and mix (p. {s * 5 + i}).</p>"
+            for i in range(1, 9)
+        )
+        for s in range(1, 7)
+    )
+    + "</body></html>"
+)
+
+DIGEST_JSON = json.dumps({
+    "company_overview": [{"fact": "Founded 2004; 1,200 employees across 9 sites", "page": 3}],
+    "revenue": [{"fact": "FY2023 revenue $182.4M, up 8.1% YoY", "page": 24}],
+    "ebitda": [{"fact": "FY2023 adjusted EBITDA $32.8M", "page": 24}],
+    "margins": [{"fact": "FY2023 gross margin 45.0%", "page": 25}],
+    "customer_concentration": [{"fact": "Top 5 customers 41% of FY2023 revenue", "page": 18}],
+    "management": [{"fact": "CEO with 22 years of industry experience", "page": 30}],
+    "deal_process": [{"fact": "First-round bids due in six weeks", "page": 40}],
+})
+
+CHAT_ANSWER = "FY2023 revenue was $182.4M, up 8.1% year over year (p. 24)."
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class LatencyModel:
+    base_seconds: float = 0.3
+    input_tokens_per_second: float = 50000.0
+    output_tokens_per_second: float = 100.0
+
+    def seconds(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (
+            self.base_seconds
+            + prompt_tokens / self.input_tokens_per_second
+            + completion_tokens / self.output_tokens_per_second
+        )
+
+
+def _completion_for(body: dict) -> str:
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        return DIGEST_JSON
+    messages = body.get("messages") or []
+    last = messages[-1]["content"] if messages else ""
+    # The summary prompt asks for HTML; chat and conversation summaries get short text
+    if "HTML" in last[:20000]:
+        return SUMMARY_HTML
+    return CHAT_ANSWER
+
+
+def create_app(latency: LatencyModel = None) -> FastAPI:
+    latency = latency or LatencyModel()
+    app = FastAPI()
+    app.state.calls = 0
+    app.state.prompt_tokens = 0
+    app.state.completion_tokens = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt_text = "".join(m.get("content") or "" for m in body.get("messages", []))
+        content = _completion_for(body)
+        prompt_tokens = estimate_tokens(prompt_text)
+        completion_tokens = estimate_tokens(content)
+
+        await asyncio.sleep(latency.seconds(prompt_tokens, completion_tokens))
+
+        app.state.calls += 1
+        app.state.prompt_tokens += prompt_tokens
+        app.state.completion_tokens += completion_tokens
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4.1-mini"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "calls": app.state.calls,
+            "prompt_tokens": app.state.prompt_tokens,
+            "completion_tokens": app.state.completion_tokens
+        }
+
+    return app
@@ -0,0 +1,142 @@
+"""
+Generate synthetic CIM-like PDFs for benchmarks.
+
+Each document has a cover page followed by pages of narrative text, financial
+tables, customer and management sections, so text extraction and the LLM
+prompt see realistic volumes. Output is deterministic for a given seed.
+
+    python -m benchmarks.generate_pdfs --pages 10 40 120 --output-dir bench_pdfs
+"""
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+
+WORDS = (
+    "revenue growth margin customer contract recurring platform market share services "
+    "enterprise retention pricing backlog pipeline expansion acquisition integration "
+    "management operations facility capacity supplier distribution regional national "
+    "adjusted ebitda working capital capex synergies competitive differentiated"
+).split()
+
+SECTIONS = [
+    "Executive Summary",
+    "Investment Highlights",
+    "Company Overview",
+    "Products and Services",
+    "Customers",
+    "Market Overview",
+    "Operations",
+    "Management Team",
+    "Historical Financial Performance",
+    "Projected Financial Performance",
+    "Transaction Process",
+]
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size("letter")
+MARGIN = 54
+LINE_HEIGHT = 13
+FONT_SIZE = 10
+
+
+def _sentence(rng):
+    words = rng.choices(WORDS, k=rng.randint(8, 18))
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph_lines(rng, chars_per_line=95):
+    text = " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+    lines, current = [], ""
+    for word in text.split():
+        if len(current) + len(word) + 1 > chars_per_line:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}".strip()
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _financial_table(rng):
+    revenue = rng.uniform(40, 400)
+    rows = ["($ in millions)          FY2021    FY2022    FY2023    FY2024E"]
+    for label, scale in (("Revenue", 1.0), ("Gross Profit", 0.45), ("Adj. EBITDA", 0.18), ("Capex", 0.03)):
+        values = [revenue * scale * (1.08 ** year) for year in range(4)]
+        rows.append(f"{label:<22}" + "".join(f"{v:>10.1f}" for v in values))
+    return rows
+
+
+def _page_lines(rng, page_number, company):
+    section = SECTIONS[page_number % len(SECTIONS)]
+    lines = [f"{company} - Confidential Information Memorandum", "", section.upper(), ""]
+    if section in ("Historical Financial Performance", "Projected Financial Performance"):
+        lines += _financial_table(rng) + [""]
+    elif section == "Customers":
+        share = 100.0
+        for i in range(1, 6):
+            pct = rng.uniform(3, min(18, share))
+            share -= pct
+            lines.append(f"Customer {chr(64 + i)}: {pct:.1f}% of FY2023 revenue, {rng.randint(2, 15)} year relationship")
+        lines.append("")
+    elif section == "Management Team":
+        for title in ("Chief Executive Officer", "Chief Financial Officer", "Chief Operating Officer"):
+            lines.append(f"{title}: {rng.randint(5, 25)} years of industry experience, joined {rng.randint(2005, 2020)}")
+        lines.append("")
+
+    max_lines = int((PAGE_HEIGHT - 2 * MARGIN) / LINE_HEIGHT) - 2
+    while len(lines) < max_lines:
+        lines += _paragraph_lines(rng) + [""]
+    return lines[:max_lines]
+
+
+def generate_cim(path, pages, seed=0):
+    """Write a synthetic CIM with `pages` pages to `path` and return its size in bytes"""
+    rng = random.Random(f"{seed}-{pages}")
+    company = f"Project {rng.choice(['Atlas', 'Beacon', 'Cedar', 'Delta', 'Summit'])} Holdings"
+    doc = fitz.open()
+
+    cover = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    cover.insert_text((MARGIN, PAGE_HEIGHT / 3), company, fontsize=28)
+    cover.insert_text((MARGIN, PAGE_HEIGHT / 3 + 40), "Confidential Information Memorandum", fontsize=16)
+
+    for page_number in range(1, pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN
+        for line in _page_lines(rng, page_number, company):
+            page.insert_text((MARGIN, y), line, fontsize=FONT_SIZE, fontname="cour")
+            y += LINE_HEIGHT
+        page.insert_text((PAGE_WIDTH / 2, PAGE_HEIGHT - MARGIN / 2), str(page_number + 1), fontsize=8)
+
+    doc.save(str(path), garbage=3, deflate=True)
+    doc.close()
+    return Path(path).stat().st_size
+
+
+def generate_corpus(output_dir, page_counts, seed=0):
+    """Generate one CIM per page count; returns [(path, pages)]"""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    corpus = []
+    for pages in page_counts:
+        path = output_dir / f"cim_{pages:04d}p.pdf"
+        if not path.exists():
+            generate_cim(path, pages, seed)
+        corpus.append((path, pages))
+    return corpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic CIM-like PDFs")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 40, 120])
+    parser.add_argument("--output-dir", default="bench_pdfs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for path, pages in generate_corpus(args.output_dir, args.pages, args.seed):
+        print(f"{path} ({pages} pages, {path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+End-to-end benchmarks for the CIM pipeline against local stand-ins.
+
+Starts fake OpenAI and Supabase servers (see fake_openai.py / fake_supabase.py),
+imports the real app against them and measures:
+
+* per-stage latency: text extraction, summarization, digest, rendering,
+  storage upload and database insert, per document size
+* end-to-end /convert-pdf latency and throughput at several concurrency levels
+* /chat-pdf latency over a multi-turn conversation
+* peak Python heap (tracemalloc) and peak RSS
+
+Results are written as JSON; compare two runs with `python -m benchmarks.compare`.
+Run from the backend directory:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --pages 10 80 --concurrency 1 4 16 --no-browser --output quick.json
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from .fake_openai import SUMMARY_HTML, LatencyModel
+from .generate_pdfs import generate_corpus
+from .servers import local_stack
+
+
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))]
+
+    return {
+        "count": len(values),
+        "mean": statistics.mean(values),
+        "p50": pct(50),
+        "p95": pct(95),
+        "min": ordered[0],
+        "max": ordered[-1],
+    }
+
+
+def peak_rss_bytes():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def render_without_browser(output_pdf_path: str, html_file_path: str = "output.html") -> dict:
+    """Stand-in for async_html_to_pdf that lays the text out with PyMuPDF instead of Chromium"""
+    import fitz
+    with open(html_file_path, "r", encoding="utf-8") as f:
+        text = re.sub(r"<[^>]+>", " ", f.read())
+    doc = fitz.open()
+    for start in range(0, len(text), 3000):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text[start:start + 3000], fontsize=9)
+    doc.save(output_pdf_path, garbage=3, deflate=True)
+    doc.close()
+    return {"success": True, "message": "PDF conversion successful", "pdf_size": Path(output_pdf_path).stat().st_size}
+
+
+async def skip_browser_warm():
+    pass
+
+
+async def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    if asyncio.iscoroutine(result):
+        result = await result
+    return time.perf_counter() - start, result
+
+
+async def bench_stages(main, corpus, repeats, work_dir):
+    from utils.extract_text import extract_text_from_pdf, format_text_blocks
+    from utils.process_with_openai import load_prompt, summarize_text
+    from app.digest import build_digest
+
+    client = main.get_openai_client()
+    prompt = load_prompt()
+    results = {}
+
+    html_path = work_dir / "bench.html"
+    html_path.write_text(SUMMARY_HTML, encoding="utf-8")
+
+    for path, pages in corpus:
+        stages = {name: [] for name in ("extract", "summarize", "digest", "render", "storage_upload", "db_insert")}
+        for _ in range(repeats):
+            seconds, blocks = await timed(extract_text_from_pdf, str(path))
+            stages["extract"].append(seconds)
+        page_text = format_text_blocks(blocks)
+
+        for i in range(repeats):
+            seconds, _ = await timed(asyncio.to_thread, summarize_text, client, page_text, prompt)
+            stages["summarize"].append(seconds)
+            seconds, _ = await timed(asyncio.to_thread, build_digest, client, page_text)
+            stages["digest"].append(seconds)
+
+            pdf_path = work_dir / f"render_{pages}_{i}.pdf"
+            seconds, result = await timed(main.async_html_to_pdf, str(pdf_path), str(html_path))
+            if not result.get("success"):
+                raise RuntimeError(f"Render failed: {result.get('error')}")
+            stages["render"].append(seconds)
+
+            storage_path = f"bench/{pages}_{i}_{time.time_ns()}.pdf"
+            pdf_bytes = pdf_path.read_bytes()
+            seconds, _ = await timed(asyncio.to_thread, main.sync_storage_upload, storage_path, pdf_bytes)
+            stages["storage_upload"].append(seconds)
+
+            seconds, _ = await timed(asyncio.to_thread, main.sync_database_insert, {
+                "user_id": "bench",
+                "original_filename": path.name,
+                "summary_pdf_url": storage_path,
+                "storage_path": storage_path,
+                "title": f"Summary for {path.name}",
+                "extracted_text": page_text,
+            })
+            stages["db_insert"].append(seconds)
+
+        results[str(pages)] = {
+            "pages": pages,
+            "pdf_bytes": path.stat().st_size,
+            "text_chars": len(page_text),
+            "stages": {name: summarize(values) for name, values in stages.items()},
+        }
+    return results
+
+
+async def bench_end_to_end(main, corpus, concurrency_levels, requests_per_level):
+    import httpx
+
+    documents = [(path.name, path.read_bytes()) for path, _ in corpus]
+    headers = {"Authorization": "Bearer bench-token"}
+    results = []
+    summary_id = None
+
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench", timeout=600) as client:
+        for concurrency in concurrency_levels:
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies, failures = [], 0
+
+            async def one(i):
+                nonlocal failures, summary_id
+                name, content = documents[i % len(documents)]
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post(
+                        "/convert-pdf",
+                        headers=headers,
+                        files={"file": (name, content, "application/pdf")}
+                    )
+                    elapsed = time.perf_counter() - start
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+                    summary_id = response.json().get("summary_id")
+                else:
+                    failures += 1
+
+            wall_start = time.perf_counter()
+            await asyncio.gather(*(one(i) for i in range(requests_per_level)))
+            wall = time.perf_counter() - wall_start
+            results.append({
+                "concurrency": concurrency,
+                "requests": requests_per_level,
+                "failures": failures,
+                "wall_seconds": wall,
+                "throughput_per_minute": len(latencies) / wall * 60 if wall else 0.0,
+                "latency": summarize(latencies),
+            })
+
+        chat = []
+        if summary_id:
+            session_id = None
+            for turn in range(8):
+                start = time.perf_counter()
+                response = await client.post("/chat-pdf", headers=headers, json={
+                    "question": f"What was revenue growth in year {turn}?",
+                    "document_id": summary_id,
+                    "session_id": session_id,
+                })
+                chat.append(time.perf_counter() - start)
+                if response.status_code == 200:
+                    session_id = response.json().get("session_id")
+
+    return results, summarize(chat)
+
+
+async def run(args, work_dir):
+    corpus = generate_corpus(work_dir / "pdfs", args.pages, args.seed)
+    latency = LatencyModel(args.llm_base_latency, args.llm_input_tps, args.llm_output_tps)
+
+    with local_stack(latency, args.supabase_round_trip) as stack:
+        main = importlib.import_module("app.main")
+        if args.no_browser:
+            main.async_html_to_pdf = render_without_browser
+            main.browser_pool.warm = skip_browser_warm
+
+        tracemalloc.start()
+        try:
+            stages = await bench_stages(main, corpus, args.repeats, work_dir)
+            end_to_end, chat = await bench_end_to_end(main, corpus, args.concurrency, args.requests)
+        finally:
+            await main.browser_pool.close()
+        _, heap_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        openai_stats = {
+            "calls": stack["openai"].state.calls,
+            "prompt_tokens": stack["openai"].state.prompt_tokens,
+            "completion_tokens": stack["openai"].state.completion_tokens,
+        }
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "stages": stages,
+        "end_to_end": end_to_end,
+        "chat": chat,
+        "openai": openai_stats,
+        "memory": {"python_heap_peak_bytes": heap_peak, "peak_rss_bytes": peak_rss_bytes()},
+    }
+
+
+def print_summary(results):
+    print(f"{'pages':>6} {'stage':<15} {'mean s':>9} {'p95 s':>9}")
+    for pages, entry in results["stages"].items():
+        for stage, stats in entry["stages"].items():
+            if stats["count"]:
+                print(f"{pages:>6} {stage:<15} {stats['mean']:>9.3f} {stats['p95']:>9.3f}")
+    print()
+    print(f"{'conc':>5} {'ok':>4} {'fail':>5} {'docs/min':>9} {'p50 s':>8} {'p95 s':>8}")
+    for level in results["end_to_end"]:
+        latency = level["latency"]
+        print(
+            f"{level['concurrency']:>5} {latency['count']:>4} {level['failures']:>5} "
+            f"{level['throughput_per_minute']:>9.1f} {latency.get('p50', 0):>8.2f} {latency.get('p95', 0):>8.2f}"
+        )
+    if results["chat"]["count"]:
+        print(f"\nchat turns: mean {results['chat']['mean']:.3f}s, p95 {results['chat']['p95']:.3f}s")
+    memory = results["memory"]
+    print(f"\npeak python heap {memory['python_heap_peak_bytes'] / 2**20:.1f} MiB, "
+          f"peak RSS {memory['peak_rss_bytes']['self'] / 2**20:.1f} MiB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CIM pipeline against local stand-ins")
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 40, 120], help="Synthetic CIM sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="Repetitions per stage measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=8, help="/convert-pdf calls per concurrency level")
+    parser.add_argument("--llm-base-latency", type=float, default=0.3, help="Fixed seconds per LLM call")
+    parser.add_argument("--llm-input-tps", type=float, default=50000.0, help="Prompt tokens processed per second")
+    parser.add_argument("--llm-output-tps", type=float, default=100.0, help="Completion tokens generated per second")
+    parser.add_argument("--supabase-round-trip", type=float, default=0.02, help="Seconds added to each Supabase call")
+    parser.add_argument("--no-browser", action="store_true", help="Render with PyMuPDF instead of Chromium")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = asyncio.run(run(args, Path(temp_dir)))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
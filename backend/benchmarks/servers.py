@@ -0,0 +1,75 @@
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import uvicorn
+
+from . import fake_openai, fake_supabase
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class BackgroundServer:
+    """Serve an ASGI app with uvicorn on a free local port from a daemon thread"""
+
+    def __init__(self, app):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self, timeout: float = 10.0):
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError(f"Server on port {self.port} did not start")
+            time.sleep(0.02)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+@contextmanager
+def local_stack(latency: fake_openai.LatencyModel = None, supabase_round_trip: float = 0.0):
+    """Start the fake OpenAI and Supabase servers and point the backend's env vars at them.
+
+    Must be entered before `app.main` is imported, since the app reads its
+    configuration at import time.
+    """
+    openai_app = fake_openai.create_app(latency)
+    supabase_app = fake_supabase.create_app(supabase_round_trip)
+    openai_server = BackgroundServer(openai_app).start()
+    supabase_server = BackgroundServer(supabase_app).start()
+
+    overrides = {
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": f"{openai_server.url}/v1",
+        "SUPABASE_URL": supabase_server.url,
+        "SUPABASE_SERVICE_KEY": fake_supabase.FAKE_SERVICE_KEY,
+    }
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    try:
+        yield {
+            "openai": openai_app,
+            "supabase": supabase_app,
+            "openai_url": openai_server.url,
+            "supabase_url": supabase_server.url,
+        }
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        openai_server.stop()
+        supabase_server.stop()
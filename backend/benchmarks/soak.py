@@ -0,0 +1,320 @@
+"""
+Soak test: hold the app under steady load against the local stand-ins and fail
+if its resource usage keeps growing.
+
+Imports the real app with its lifespan running, then repeats a user cycle
+(/convert-pdf, the summary's thumbnail, a few /chat-pdf turns, then deleting
+the chat session and the summary) from several concurrent clients. Each cycle
+cleans up after itself, so the app should reach a steady state. While the
+cycles run, the process is sampled for:
+
+* RSS
+* open file descriptors
+* native threads
+* child processes (e.g. Chromium and the Playwright driver)
+* traced Python heap
+
+The first samples after the warm-up are the baseline. The run fails (exit
+status 1) if the median of the last quarter of samples exceeds the median of
+the first quarter by more than a threshold. Diffing tracemalloc snapshots
+taken after the warm-up and at the end shows where the Python heap grew.
+
+The stand-ins run in this process too, so their memory is included. It stays
+bounded because every cycle deletes what it created. Linux only, since the
+sampling reads /proc. Run from the backend directory:
+
+    python -m benchmarks.soak --cycles 2000 --no-browser --output soak.json
+    python -m benchmarks.soak --duration 3600 --concurrency 8 --max-rss-growth-mb 32
+"""
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from .fake_openai import LatencyModel
+from .generate_pdfs import generate_corpus
+from .run import git_revision, render_without_browser, skip_browser_warm
+from .servers import local_stack
+
+# Sampled resources and the CLI option holding each one's allowed growth
+RESOURCES = {
+    "rss_bytes": "max_rss_growth_mb",
+    "heap_bytes": "max_heap_growth_mb",
+    "fds": "max_fd_growth",
+    "threads": "max_thread_growth",
+    "children": "max_child_growth",
+}
+MIB = 2 ** 20
+
+
+def _status_field(name: str) -> int:
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(name + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _descendants(pid: int) -> int:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="ascii", errors="replace") as f:
+                # The command name may contain spaces, so parse after its closing parenthesis
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # Exited while scanning
+        children.setdefault(ppid, []).append(int(entry))
+    count, stack = 0, [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            count += 1
+            stack.append(child)
+    return count
+
+
+def sample(started: float, cycles_done: int) -> dict:
+    gc.collect()
+    return {
+        "elapsed_seconds": time.perf_counter() - started,
+        "cycles": cycles_done,
+        "rss_bytes": _status_field("VmRSS") * 1024,
+        "heap_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0,
+        "fds": len(os.listdir("/proc/self/fd")),
+        "threads": _status_field("Threads"),
+        "python_threads": threading.active_count(),
+        "children": _descendants(os.getpid()),
+    }
+
+
+def growth(samples: list, args) -> dict:
+    """Median of the last quarter of samples minus median of the first quarter, per resource"""
+    window = max(1, len(samples) // 4)
+    report = {}
+    for resource, option in RESOURCES.items():
+        if resource == "heap_bytes" and not args.tracemalloc_frames:
+            continue
+        limit = getattr(args, option) * (MIB if resource.endswith("_bytes") else 1)
+        baseline = statistics.median(s[resource] for s in samples[:window])
+        final = statistics.median(s[resource] for s in samples[-window:])
+        report[resource] = {
+            "baseline": baseline,
+            "final": final,
+            "growth": final - baseline,
+            "limit": limit,
+            "ok": final - baseline <= limit,
+        }
+    return report
+
+
+def heap_diff(before, after, limit: int = 15) -> list:
+    """The allocation sites that grew the most between two snapshots"""
+    grown = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0]
+    grown.sort(key=lambda stat: stat.size_diff, reverse=True)
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_diff_bytes": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in grown[:limit]
+    ]
+
+
+async def user_cycle(client, document, chat_turns: int, failures: dict):
+    """One upload, thumbnail view and short conversation, then delete everything it created"""
+    headers = {"Authorization": "Bearer soak-token"}
+
+    def failed(step: str, response) -> bool:
+        if response.status_code >= 400:
+            failures[step] = failures.get(step, 0) + 1
+            return True
+        return False
+
+    name, content = document
+    response = await client.post("/convert-pdf", headers=headers, files={"file": (name, content, "application/pdf")})
+    if failed("convert", response):
+        return
+    body = response.json()
+    summary_id = body["summary_id"]
+
+    storage_path = body["public_url"].split("/summaries/", 1)[1]
+    failed("thumbnail", await client.get(f"/thumbnails/{storage_path}"))
+
+    session_id = None
+    for turn in range(chat_turns):
+        response = await client.post("/chat-pdf", headers=headers, json={
+            "question": f"What was EBITDA margin in year {turn}?",
+            "document_id": summary_id,
+            "session_id": session_id,
+        })
+        if failed("chat", response):
+            break
+        session_id = response.json().get("session_id")
+
+    if session_id:
+        failed("delete_chat_session", await client.delete(f"/chat-sessions/{session_id}", headers=headers))
+    failed("delete_summary", await client.delete(f"/summaries/{summary_id}", headers=headers))
+
+
+async def run(args, work_dir):
+    import httpx
+
+    corpus = generate_corpus(work_dir / "pdfs", args.pages, args.seed)
+    documents = [(path.name, path.read_bytes()) for path, _ in corpus]
+    latency = LatencyModel(args.llm_base_latency, args.llm_input_tps, args.llm_output_tps)
+
+    if args.tracemalloc_frames:
+        tracemalloc.start(args.tracemalloc_frames)
+
+    with local_stack(latency, args.supabase_round_trip):
+        main = importlib.import_module("app.main")
+        if args.no_browser:
+            main.async_html_to_pdf = render_without_browser
+            main.browser_pool.warm = skip_browser_warm
+
+        failures = {}
+        samples = []
+        cycles_done = 0
+        next_cycle = 0
+        started = time.perf_counter()
+        deadline = started + args.duration if args.duration else None
+        total = args.warmup + args.cycles
+
+        def more_cycles() -> bool:
+            if deadline is not None:
+                return time.perf_counter() < deadline or next_cycle < args.warmup
+            return next_cycle < total
+
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(app=main.app, base_url="http://soak", timeout=600) as client:
+
+                async def worker():
+                    nonlocal next_cycle, cycles_done
+                    while more_cycles():
+                        index = next_cycle
+                        next_cycle += 1
+                        await user_cycle(client, documents[index % len(documents)], args.chat_turns, failures)
+                        cycles_done += 1
+
+                async def sampler():
+                    while True:
+                        await asyncio.sleep(args.sample_interval)
+                        if cycles_done < args.warmup:
+                            continue
+                        current = sample(started, cycles_done)
+                        samples.append(current)
+                        print(
+                            f"{current['elapsed_seconds']:>7.0f}s {current['cycles']:>6} cycles "
+                            f"rss {current['rss_bytes'] / MIB:>7.1f} MiB  heap {current['heap_bytes'] / MIB:>6.1f} MiB  "
+                            f"fds {current['fds']:>4}  threads {current['threads']:>3}  children {current['children']:>3}",
+                            flush=True
+                        )
+
+                workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+                # The warm-up fills caches, pools and lazy imports before the baseline is taken
+                while cycles_done < args.warmup and not all(w.done() for w in workers):
+                    await asyncio.sleep(0.1)
+                gc.collect()
+                snapshot_before = tracemalloc.take_snapshot() if args.tracemalloc_frames else None
+                samples.append(sample(started, cycles_done))
+
+                sampling = asyncio.create_task(sampler())
+                try:
+                    await asyncio.gather(*workers)
+                finally:
+                    sampling.cancel()
+                samples.append(sample(started, cycles_done))
+                gc.collect()
+                snapshot_after = tracemalloc.take_snapshot() if args.tracemalloc_frames else None
+
+    if args.tracemalloc_frames:
+        tracemalloc.stop()
+
+    attempted = max(1, cycles_done)
+    failure_rate = sum(failures.values()) / attempted
+    resources = growth(samples, args)
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "cycles": cycles_done,
+        "failures": failures,
+        "failure_rate": failure_rate,
+        "resources": resources,
+        "heap_growth_top": heap_diff(snapshot_before, snapshot_after) if args.tracemalloc_frames else [],
+        "samples": samples,
+        "passed": failure_rate <= args.max_failure_rate and all(r["ok"] for r in resources.values()),
+    }
+
+
+def print_summary(results):
+    print(f"\n{results['cycles']} cycles, failures: {results['failures'] or 'none'}")
+    print(f"{'resource':<11} {'baseline':>12} {'final':>12} {'growth':>12} {'limit':>12}")
+    for resource, entry in results["resources"].items():
+        scale = MIB if resource.endswith("_bytes") else 1
+        values = [entry[k] / scale for k in ("baseline", "final", "growth", "limit")]
+        print(f"{resource:<11} " + " ".join(f"{v:>12.1f}" for v in values) + ("" if entry["ok"] else "  EXCEEDED"))
+    if results["heap_growth_top"]:
+        print("\nLargest Python heap growth since the warm-up:")
+        for entry in results["heap_growth_top"][:10]:
+            print(f"  {entry['size_diff_bytes'] / 1024:>9.1f} KiB {entry['count_diff']:>+8} blocks  {entry['location']}")
+    print(f"\n{'PASSED' if results['passed'] else 'FAILED'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak-test the app against local stand-ins and check for resource growth")
+    parser.add_argument("--cycles", type=int, default=2000, help="User cycles to run after the warm-up")
+    parser.add_argument("--duration", type=float, default=None, help="Run for this many seconds instead of --cycles")
+    parser.add_argument("--warmup", type=int, default=50, help="Cycles before the baseline is taken")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent simulated users")
+    parser.add_argument("--chat-turns", type=int, default=3, help="/chat-pdf turns per cycle")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20], help="Synthetic CIM sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds between resource samples")
+    parser.add_argument("--tracemalloc-frames", type=int, default=1, help="Traceback depth for heap tracing; 0 disables it")
+    parser.add_argument("--llm-base-latency", type=float, default=0.05, help="Fixed seconds per LLM call")
+    parser.add_argument("--llm-input-tps", type=float, default=500000.0, help="Prompt tokens processed per second")
+    parser.add_argument("--llm-output-tps", type=float, default=5000.0, help="Completion tokens generated per second")
+    parser.add_argument("--supabase-round-trip", type=float, default=0.0, help="Seconds added to each Supabase call")
+    parser.add_argument("--no-browser", action="store_true", help="Render with PyMuPDF instead of Chromium")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--max-heap-growth-mb", type=float, default=16.0)
+    parser.add_argument("--max-fd-growth", type=int, default=16)
+    parser.add_argument("--max-thread-growth", type=int, default=8)
+    parser.add_argument("--max-child-growth", type=int, default=2)
+    parser.add_argument("--max-failure-rate", type=float, default=0.01, help="Allowed failed requests per cycle")
+    parser.add_argument("--output", default="soak_results.json")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir("/proc/self/fd"):
+        parser.error("the soak test samples /proc and only runs on Linux")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results = asyncio.run(run(args, Path(temp_dir)))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"\nWrote {args.output}")
+    sys.exit(0 if results["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cold start benchmark.
+
+Each repeat starts a fresh interpreter against the local stand-ins and measures:
+
+* import_seconds: `import app.main` on its own
+* first_health_seconds: spawning uvicorn until `/health` first answers
+* health_checked_seconds: until `/health` reports a completed dependency check
+* browser_ready_seconds: until the background browser warm-up finished
+* health_probe: latency of `/health` once the server is up
+
+Run from the backend directory:
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --no-browser --importtime
+
+Results can be compared with `python -m benchmarks.compare` like the pipeline runs.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from .run import git_revision, summarize
+from .servers import _free_port, local_stack
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def measure_import(env):
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, limit):
+    """Top modules by cumulative import time, from python -X importtime"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        # Only modules imported directly by app.main or its package
+        if len(module) - len(module.lstrip()) <= 3:
+            rows.append((module.strip(), int(cumulative) / 1e6))
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:limit]
+
+
+def wait_for(client, url, predicate, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(url)
+            if response.status_code == 200 and predicate(response.json()):
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_server(env, probes, timeout, wait_for_browser):
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = start + timeout
+    result = {}
+    try:
+        with httpx.Client(timeout=5) as client:
+            first = wait_for(client, url, lambda body: True, deadline)
+            if first is None:
+                raise RuntimeError(f"Server did not answer /health within {timeout}s")
+            result["first_health_seconds"] = first - start
+
+            checked = wait_for(client, url, lambda body: body.get("checked_at") is not None, deadline)
+            result["health_checked_seconds"] = checked - start if checked else None
+
+            if wait_for_browser:
+                ready = wait_for(client, url, lambda body: body.get("browser") in ("ready", "error"), deadline)
+                result["browser_ready_seconds"] = ready - start if ready else None
+
+            latencies = []
+            for _ in range(probes):
+                probe_start = time.perf_counter()
+                client.get(url)
+                latencies.append(time.perf_counter() - probe_start)
+            result["probe_latencies"] = latencies
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure API cold start against local stand-ins")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--probes", type=int, default=50, help="/health requests timed after startup")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each server start")
+    parser.add_argument("--no-browser", action="store_true", help="Disable the background Chromium warm-up")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest top-level imports")
+    parser.add_argument("--output", default="startup_results.json")
+    args = parser.parse_args(argv)
+
+    with local_stack():
+        env = dict(os.environ)
+        env["BROWSER_WARM_ON_STARTUP"] = "0" if args.no_browser else "1"
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(BACKEND_DIR), env.get("PYTHONPATH")]))
+
+        imports, servers = [], []
+        for _ in range(args.repeats):
+            imports.append(measure_import(env))
+            servers.append(measure_server(env, args.probes, args.timeout, not args.no_browser))
+        top_imports = slowest_imports(env, 15) if args.importtime else []
+
+    def collect(key):
+        return [run[key] for run in servers if run.get(key) is not None]
+
+    results = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "startup": {
+            "import_seconds": summarize(imports),
+            "first_health_seconds": summarize(collect("first_health_seconds")),
+            "health_checked_seconds": summarize(collect("health_checked_seconds")),
+            "browser_ready_seconds": summarize(collect("browser_ready_seconds")),
+            "health_probe": summarize([latency for run in servers for latency in run["probe_latencies"]]),
+        },
+        "slowest_imports": dict(top_imports),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'metric':<24} {'mean s':>9} {'p95 s':>9}")
+    for name, stats in results["startup"].items():
+        if stats["count"]:
+            print(f"{name:<24} {stats['mean']:>9.3f} {stats['p95']:>9.3f}")
+    if top_imports:
+        print("\nslowest imports (cumulative):")
+        for module, seconds in top_imports:
+            print(f"  {module:<40} {seconds:>7.3f}s")
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Multi-worker serving. Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is imported once in the master and forked into WEB_CONCURRENCY uvicorn
+workers. Caches, chat sessions, batch status and rate budgets go through
+STATE_BACKEND_URL, which defaults to a SQLite file in WAL mode here. Point it at
+redis://... to share state between machines. Metrics from all workers are
+aggregated through PROMETHEUS_MULTIPROC_DIR.
+
+Everything below runs before the app is preloaded, which is why the environment
+is set at module level rather than in a server hook.
+"""
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+preload_app = True
+# Large CIMs can take minutes end to end; workers heartbeat independently of requests
+timeout = 120
+graceful_timeout = 60
+keepalive = 5
+
+# The app sizes per-worker pools from this (see app/browser_pool.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+if "STATE_BACKEND_URL" not in os.environ:
+    # Default to a fresh state file per deployment; an explicit path is left untouched
+    state_path = os.path.join(tempfile.gettempdir(), "cimreader-state.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(state_path + suffix):
+            os.remove(state_path + suffix)
+    os.environ["STATE_BACKEND_URL"] = f"sqlite://{state_path}"
+
+if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    metrics_dir = os.path.join(tempfile.gettempdir(), "cimreader-metrics")
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges from the aggregated metrics
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
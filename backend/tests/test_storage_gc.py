@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.shared_state import MemoryState
+from app.storage_gc import OrphanSweeper
+
+OLD = (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()
+NEW = datetime.now(timezone.utc).isoformat()
+
+
+class FakeBucket:
+    """Stubs for the sweeper's list / reference lookup / delete callables"""
+
+    def __init__(self, objects, referenced):
+        self.objects = dict(objects)  # path -> created_at
+        self.referenced = set(referenced)
+        self.lookups = []
+        self.deleted = []
+
+    def list_objects(self, prefix, limit, offset):
+        depth = prefix.count("/") + 1 if prefix else 0
+        entries = {}
+        for path, created_at in self.objects.items():
+            if prefix and not path.startswith(prefix + "/"):
+                continue
+            name = path.split("/")[depth]
+            if len(path.split("/")) == depth + 1:
+                entries[name] = {"id": path, "name": name, "created_at": created_at}
+            else:
+                entries.setdefault(name, {"id": None, "name": name})
+        page = sorted(entries.values(), key=lambda entry: entry["name"])[offset:offset + limit]
+        return {"success": True, "data": page}
+
+    def referenced_paths(self, paths):
+        self.lookups.append(list(paths))
+        return {"success": True, "data": self.referenced & set(paths)}
+
+    def delete_objects(self, paths):
+        self.deleted.extend(paths)
+        for path in paths:
+            self.objects.pop(path, None)
+        return {"success": True, "deleted": list(paths)}
+
+
+def make_sweeper(bucket):
+    return OrphanSweeper(
+        MemoryState(), bucket.list_objects, bucket.referenced_paths, bucket.delete_objects,
+        interval=60, grace_seconds=60 * 60
+    )
+
+
+def test_deletes_only_old_unreferenced_objects():
+    bucket = FakeBucket(
+        {
+            "user-a/kept.pdf": OLD,
+            "user-a/orphan.pdf": OLD,
+            "user-a/fresh.pdf": NEW,
+            "user-b/orphan.pdf": OLD,
+        },
+        referenced={"user-a/kept.pdf"},
+    )
+
+    result = make_sweeper(bucket).sweep()
+
+    assert sorted(bucket.deleted) == ["user-a/orphan.pdf", "user-b/orphan.pdf"]
+    assert result == {"scanned": 3, "orphans": 2, "deleted": 2}
+    assert "user-a/fresh.pdf" not in sum(bucket.lookups, [])
+
+
+def test_lookup_failure_deletes_nothing():
+    bucket = FakeBucket({"user-a/orphan.pdf": OLD}, referenced=set())
+    bucket.referenced_paths = lambda paths: {"success": False, "message": "database down"}
+
+    with pytest.raises(Exception, match="database down"):
+        make_sweeper(bucket).sweep()
+    assert bucket.deleted == []
+
+
+def test_pages_through_large_folders(monkeypatch):
+    import app.storage_gc as storage_gc
+    monkeypatch.setattr(storage_gc, "LIST_PAGE_SIZE", 2)
+    monkeypatch.setattr(storage_gc, "CHUNK_SIZE", 2)
+    monkeypatch.setattr(storage_gc, "LOOKUP_CHUNK_SIZE", 2)
+    objects = {f"user-a/{i}.pdf": OLD for i in range(5)}
+    bucket = FakeBucket(objects, referenced={"user-a/0.pdf", "user-a/3.pdf"})
+
+    make_sweeper(bucket).sweep()
+
+    assert sorted(bucket.deleted) == ["user-a/1.pdf", "user-a/2.pdf", "user-a/4.pdf"]
+
+
+def test_deletes_thumbnails_whose_pdf_is_unreferenced():
+    bucket = FakeBucket(
+        {
+            "user-a/kept.pdf": OLD,
+            "thumbnails/user-a/kept.png": OLD,
+            "thumbnails/user-a/gone.png": OLD,
+            "thumbnails/user-a/fresh.png": NEW,
+            "thumbnails/user-b/gone.png": OLD,
+        },
+        referenced={"user-a/kept.pdf"},
+    )
+
+    result = make_sweeper(bucket).sweep()
+
+    assert sorted(bucket.deleted) == ["thumbnails/user-a/gone.png", "thumbnails/user-b/gone.png"]
+    assert result == {"scanned": 4, "orphans": 2, "deleted": 2}
+    looked_up = sum(bucket.lookups, [])
+    assert sorted(looked_up) == ["user-a/gone.pdf", "user-a/kept.pdf", "user-b/gone.pdf"]
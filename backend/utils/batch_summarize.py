@@ -0,0 +1,341 @@
+"""
+Summarize a directory (or manifest) of CIMs offline.
+
+Runs extraction, summarization and rendering for every PDF with a pool of
+workers and writes each document's outputs to its own directory. Completed
+documents are appended to a checkpoint file, so re-running the same command
+after a crash picks up where it stopped. The checkpoint is keyed on both the
+PDF's hash and the hash of prompt.txt, so editing the prompt and re-running
+re-summarizes everything. It also records which optional outputs (rendered
+PDF, digest) each document got, so asking for more of them redoes the
+documents that lack them.
+
+Run from the backend directory:
+
+    python -m utils.batch_summarize ~/cims --output-dir out --workers 8
+    python -m utils.batch_summarize manifest.txt --output-dir out --no-render
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import statistics
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from utils.extract_text import extract_text_from_pdf, format_text_blocks
+from utils.process_with_openai import PROMPT_FILE, get_client, load_prompt, summarize_text
+from utils.html_to_pdf import render_html_to_pdf
+
+logger = logging.getLogger("batch_summarize")
+
+CHECKPOINT_FILE = "checkpoint.jsonl"
+STAGES = ("extract", "summarize", "digest", "render")
+# Optional outputs and the file each one writes into a document's directory
+OPTIONAL_OUTPUTS = {"pdf": "summary.pdf", "digest": "digest.json"}
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def collect_inputs(source):
+    """PDFs under a directory (recursive), or the paths listed in a manifest file"""
+    source = Path(source)
+    if source.is_dir():
+        return sorted(p for p in source.rglob("*") if p.is_file() and p.suffix.lower() == ".pdf")
+
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = Path(line).expanduser()
+            if not path.is_absolute():
+                path = source.parent / path
+            paths.append(path)
+    return paths
+
+
+def requested_outputs(render, with_digest):
+    outputs = set()
+    if render:
+        outputs.add("pdf")
+    if with_digest:
+        outputs.add("digest")
+    return outputs
+
+
+def recorded_outputs(record):
+    """Optional outputs a checkpoint record covers; older records are checked on disk"""
+    if "outputs" in record:
+        return set(record["outputs"])
+    doc_dir = Path(record["output"])
+    return {name for name, filename in OPTIONAL_OUTPUTS.items() if (doc_dir / filename).exists()}
+
+
+def load_checkpoint(output_dir):
+    """Return {(pdf_sha, prompt_sha): record} for documents already completed.
+
+    A document's directory is rewritten each time it is processed, so its
+    latest record describes what is there now.
+    """
+    done = {}
+    checkpoint_path = output_dir / CHECKPOINT_FILE
+    if not checkpoint_path.exists():
+        return done
+    with open(checkpoint_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash mid-write leaves at most one partial trailing line
+                continue
+            done[(record["sha256"], record["prompt_sha256"])] = record
+    return done
+
+
+class Checkpoint:
+    """Append-only JSONL of completed documents, flushed to disk after every record"""
+
+    def __init__(self, output_dir):
+        self._file = open(output_dir / CHECKPOINT_FILE, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Renderer:
+    """Render threads that each own one Chromium.
+
+    Playwright's sync API objects can only be used from the thread that created
+    them, so documents hand their HTML to these threads instead of sharing browsers.
+    """
+
+    def __init__(self, threads):
+        self._jobs = queue.Queue()
+        self._threads = [threading.Thread(target=self._run, daemon=True) for _ in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self):
+        try:
+            from playwright.sync_api import sync_playwright
+            with sync_playwright() as p:
+                browser = p.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+                )
+                page = browser.new_page()
+                while True:
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    html_path, pdf_path, future = job
+                    try:
+                        render_html_to_pdf(page, html_path, pdf_path)
+                        future.set_result(None)
+                    except Exception as e:
+                        future.set_exception(e)
+                        page.close()
+                        page = browser.new_page()
+                browser.close()
+        except Exception as e:
+            # Without a browser this thread can only fail the jobs it picks up
+            logger.error(f"Render thread failed: {str(e)}")
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                job[2].set_exception(e)
+
+    def render(self, html_path, pdf_path):
+        future = Future()
+        self._jobs.put((html_path, pdf_path, future))
+        future.result()
+
+    def close(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
+
+
+def process_document(pdf_path, pdf_sha, output_dir, client, prompt, renderer, with_digest):
+    timings = {}
+    doc_dir = output_dir / f"{pdf_path.stem}-{pdf_sha[:8]}"
+    # Write into a scratch directory and rename at the end so a crash never leaves half a result
+    work_dir = doc_dir.with_name(doc_dir.name + ".partial")
+    shutil.rmtree(work_dir, ignore_errors=True)
+    work_dir.mkdir(parents=True)
+
+    start = time.perf_counter()
+    page_text = format_text_blocks(extract_text_from_pdf(str(pdf_path)))
+    timings["extract"] = time.perf_counter() - start
+    (work_dir / "text.text").write_text(page_text, encoding="utf-8")
+
+    start = time.perf_counter()
+    html = summarize_text(client, page_text, prompt)
+    timings["summarize"] = time.perf_counter() - start
+    html_path = work_dir / "summary.html"
+    html_path.write_text(html, encoding="utf-8")
+
+    if with_digest:
+        from app.digest import build_digest
+        start = time.perf_counter()
+        digest = build_digest(client, page_text)
+        timings["digest"] = time.perf_counter() - start
+        if digest is None:
+            # Fail the document so a later --digest run retries it instead of skipping it
+            raise RuntimeError("Digest extraction failed")
+        (work_dir / "digest.json").write_text(json.dumps(digest, indent=2), encoding="utf-8")
+
+    if renderer is not None:
+        start = time.perf_counter()
+        renderer.render(html_path, work_dir / "summary.pdf")
+        timings["render"] = time.perf_counter() - start
+
+    shutil.rmtree(doc_dir, ignore_errors=True)
+    work_dir.rename(doc_dir)
+    return doc_dir, timings
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_report(stage_timings, completed, failed, skipped, elapsed):
+    print()
+    print(f"Completed {completed}, failed {failed}, skipped (already done) {skipped} in {elapsed:.1f}s")
+    if completed and elapsed > 0:
+        print(f"Throughput: {completed / elapsed * 60:.2f} documents/minute")
+    print()
+    print(f"{'stage':<10} {'count':>6} {'total s':>9} {'mean s':>8} {'p50 s':>8} {'p95 s':>8} {'max s':>8}")
+    for stage in STAGES:
+        values = stage_timings.get(stage)
+        if not values:
+            continue
+        print(
+            f"{stage:<10} {len(values):>6} {sum(values):>9.1f} {statistics.mean(values):>8.2f} "
+            f"{percentile(values, 50):>8.2f} {percentile(values, 95):>8.2f} {max(values):>8.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a directory or manifest of CIM PDFs")
+    parser.add_argument("source", help="Directory of PDFs (searched recursively) or a manifest with one path per line")
+    parser.add_argument("--output-dir", required=True, help="Where per-document outputs and the checkpoint are written")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed concurrently (default: 4)")
+    parser.add_argument("--no-render", action="store_true", help="Skip HTML to PDF rendering")
+    parser.add_argument("--digest", action="store_true", help="Also extract the chat fact sheet (digest.json)")
+    parser.add_argument("--force", action="store_true", help="Ignore the checkpoint and redo every document")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    inputs = collect_inputs(args.source)
+    if not inputs:
+        logger.error(f"No PDFs found in {args.source}")
+        return 1
+
+    prompt = load_prompt()
+    prompt_sha = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    done = {} if args.force else load_checkpoint(output_dir)
+    outputs = requested_outputs(not args.no_render, args.digest)
+
+    # Hash up front: it decides what to skip and dedupes identical files under different names
+    pending = {}
+    skipped = 0
+    for path in inputs:
+        pdf_sha = sha256_file(path)
+        record = done.get((pdf_sha, prompt_sha))
+        if record is not None and outputs <= recorded_outputs(record):
+            skipped += 1
+        elif pdf_sha not in pending:
+            pending[pdf_sha] = path
+    logger.info(f"{len(inputs)} inputs, {len(pending)} to process, {skipped} already done (prompt {prompt_sha[:8]} from {PROMPT_FILE})")
+
+    client = get_client()
+    renderer = None if args.no_render else Renderer(args.workers)
+    checkpoint = Checkpoint(output_dir)
+    stage_timings = {}
+    completed = failed = 0
+    started = time.perf_counter()
+
+    def handle(future, path, pdf_sha):
+        nonlocal completed, failed
+        try:
+            doc_dir, timings = future.result()
+        except Exception as e:
+            failed += 1
+            logger.error(f"Failed {path}: {str(e)}")
+            logger.debug(traceback.format_exc())
+            return
+
+        completed += 1
+        for stage, seconds in timings.items():
+            stage_timings.setdefault(stage, []).append(seconds)
+        checkpoint.record({
+            "source": str(path),
+            "sha256": pdf_sha,
+            "prompt_sha256": prompt_sha,
+            "output": str(doc_dir),
+            "outputs": sorted(outputs),
+            "timings": timings,
+            "completed_at": time.time()
+        })
+        logger.info(f"[{completed + failed}/{len(pending)}] {path.name} done in {sum(timings.values()):.1f}s")
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {
+                pool.submit(process_document, path, pdf_sha, output_dir, client, prompt, renderer, args.digest): (path, pdf_sha)
+                for pdf_sha, path in pending.items()
+            }
+            try:
+                for future in as_completed(futures):
+                    handle(future, *futures.pop(future))
+            except KeyboardInterrupt:
+                # Drop queued documents, then checkpoint the finished and running ones
+                # as they complete so a resume doesn't redo them
+                pool.shutdown(wait=False, cancel_futures=True)
+                running = {future: doc for future, doc in futures.items() if not future.cancelled()}
+                logger.warning(f"Interrupted - finishing {len(running)} running documents; re-run to resume")
+                for future in as_completed(running):
+                    handle(future, *running[future])
+                return 130
+    finally:
+        checkpoint.close()
+        if renderer is not None:
+            renderer.close()
+
+    print_report(stage_timings, completed, failed, skipped, time.perf_counter() - started)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
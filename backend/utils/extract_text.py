@@ -1,4 +1,3 @@
-import fitz
 import os
 from pathlib import Path
 
@@ -10,6 +9,8 @@ MIN_PX_HEIGHT  = 100    # at least 200 px tall
 ROOT_DIR = Path(__file__).parent.parent
 
 def extract_text_from_pdf(pdf_path):
+    # Imported here so importing this module (e.g. from the API) does not load MuPDF
+    import fitz
     doc = fitz.open(pdf_path)
     text_blocks = []
     for page_number in range(len(doc)):
@@ -19,15 +20,27 @@ def extract_text_from_pdf(pdf_path):
             text_blocks.append((page_number, text))
     return text_blocks
 
+def get_page_count(pdf_path):
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        return len(doc)
+
+def format_text_blocks(text_blocks):
+    """Join extracted blocks with page markers so the model can cite pages"""
+    return "".join(
+        f"--- Page {page_num + 1} ---\n{text}\n\n" for page_num, text in text_blocks
+    )
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) < 2:
-        print("Usage: python extract_text.py <path_to_pdf>")
+        print("Usage: python extract_text.py <path_to_pdf> [output.text]")
         sys.exit(1)
     pdf_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else ROOT_DIR / "text.text"
     blocks = extract_text_from_pdf(pdf_path)
 
-    with open(ROOT_DIR / "text.text", "w", encoding="utf-8") as f:
+    with open(output_path, "w", encoding="utf-8") as f:
         for page_num, text in blocks:
             f.write(f"--- Page {page_num + 1} ---\n")
             f.write(text[:1000000] + "\n\n")  # show  the text
@@ -1,26 +1,48 @@
 import sys
 import subprocess
 import os
-from playwright.sync_api import sync_playwright
+from pathlib import Path
+
+UTILS_DIR = Path(__file__).parent
+
+# Page setup shared by the API renderer and the CLI tools
+PDF_OPTIONS = {
+    "format": "A4",
+    "print_background": True,
+    "margin": {
+        "top": "20px",
+        "bottom": "20px",
+        "left": "20px",
+        "right": "20px"
+    }
+}
+
+def render_html_to_pdf(page, html_path, pdf_path):
+    """Render a local HTML file to PDF with a Playwright (sync API) page"""
+    abs_html_path = "file://" + os.path.abspath(html_path)
+    page.goto(abs_html_path, wait_until="networkidle", timeout=30000)
+    page.pdf(path=str(pdf_path), **PDF_OPTIONS)
 
 if __name__ == "__main__":
+    from playwright.sync_api import sync_playwright
+
     if len(sys.argv) < 3:
         print("Usage: python html_to_pdf.py <path_to_pdf> <output.pdf>")
         exit(1)
     pdf_input = sys.argv[1]
     pdf_output = sys.argv[2]
+    # Keep the intermediate HTML next to the output so parallel runs don't collide
+    html_output = Path(pdf_output).with_suffix(".html")
 
-    # Call process_with_openai.py to generate output.html
+    # Call process_with_openai.py to generate the HTML brief
     subprocess.run(
-        ["python3", "process_with_openai.py", pdf_input],
+        [sys.executable, str(UTILS_DIR / "process_with_openai.py"), pdf_input, str(html_output)],
         check=True
     )
 
-    # Use Playwright to convert output.html to PDF
+    # Use Playwright to convert the HTML to PDF
     with sync_playwright() as p:
         browser = p.chromium.launch()
         page = browser.new_page()
-        abs_html_path = "file://" + os.path.abspath("output.html")
-        page.goto(abs_html_path)
-        page.pdf(path=pdf_output)
-        browser.close()
\ No newline at end of file
+        render_html_to_pdf(page, html_output, pdf_output)
+        browser.close()
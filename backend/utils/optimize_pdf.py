@@ -0,0 +1,49 @@
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def _has_fonttools():
+    try:
+        import fontTools.subset  # noqa: F401 - used by Document.subset_fonts
+        return True
+    except ImportError:
+        return False
+
+
+def optimize_pdf_bytes(pdf_bytes):
+    """Rewrite a PDF with unused objects removed and all streams deflated.
+
+    Fonts are subset too when the optional fontTools package is installed.
+    Returns the original bytes if rewriting doesn't make the file smaller.
+    """
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if _has_fonttools():
+            try:
+                doc.subset_fonts()
+            except Exception as e:
+                logger.warning(f"Font subsetting failed, keeping original fonts: {str(e)}")
+        optimized = doc.tobytes(
+            garbage=4,
+            clean=True,
+            deflate=True,
+            deflate_images=True,
+            deflate_fonts=True,
+        )
+    return optimized if len(optimized) < len(pdf_bytes) else pdf_bytes
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python optimize_pdf.py <input.pdf> [output.pdf]")
+        sys.exit(1)
+    input_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else input_path
+    with open(input_path, "rb") as f:
+        original = f.read()
+    optimized = optimize_pdf_bytes(original)
+    with open(output_path, "wb") as f:
+        f.write(optimized)
+    print(f"{len(original)} -> {len(optimized)} bytes ({len(original) - len(optimized)} saved)")
@@ -0,0 +1,30 @@
+import sys
+
+# Wide enough for a sharp card preview on high-DPI screens, small enough to stay a few KB
+THUMBNAIL_WIDTH = 320
+
+
+def render_thumbnail(pdf_bytes, width=THUMBNAIL_WIDTH):
+    """Render the first page of a PDF to a PNG `width` pixels wide."""
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        if doc.page_count == 0:
+            raise ValueError("PDF has no pages")
+        page = doc[0]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return pixmap.tobytes("png")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python thumbnail.py <input.pdf> [output.png] [width]")
+        sys.exit(1)
+    input_path = sys.argv[1]
+    output_path = sys.argv[2] if len(sys.argv) > 2 else input_path.rsplit(".", 1)[0] + ".png"
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else THUMBNAIL_WIDTH
+    with open(input_path, "rb") as f:
+        thumbnail = render_thumbnail(f.read(), width)
+    with open(output_path, "wb") as f:
+        f.write(thumbnail)
+    print(f"Wrote {len(thumbnail)} byte thumbnail to {output_path}")
@@ -33,6 +33,7 @@ const PDFChat: React.FC<PDFChatProps> = ({ documentId, documentTitle }) => {
   const [messages, setMessages] = useState<Message[]>([]);
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -56,6 +57,11 @@ const PDFChat: React.FC<PDFChatProps> = ({ documentId, documentTitle }) => {
     }
   }, [documentTitle]);
 
+  // Start a fresh server-side conversation when switching documents
+  useEffect(() => {
+    setSessionId(null);
+  }, [documentId]);
+
   const handleSendMessage = async () => {
     if (!inputValue.trim() || !session || !documentId) return;
 
@@ -76,7 +82,8 @@ const PDFChat: React.FC<PDFChatProps> = ({ documentId, documentTitle }) => {
         headers: createAuthHeaders(session.access_token),
         body: JSON.stringify({
           question: userMessage.content,
-          document_id: documentId
+          document_id: documentId,
+          session_id: sessionId
         })
       });
 
@@ -85,6 +92,9 @@ const PDFChat: React.FC<PDFChatProps> = ({ documentId, documentTitle }) => {
       }
 
       const data = await response.json();
+      if (data.session_id) {
+        setSessionId(data.session_id);
+      }
 
       const aiMessage: Message = {
         id: (Date.now() + 1).toString(),
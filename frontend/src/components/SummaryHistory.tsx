@@ -10,6 +10,7 @@ interface Summary {
   id: string;
   title: string;
   summary_pdf_url: string;
+  storage_path: string | null;
 }
 
 export function SummaryHistory() {
@@ -17,6 +18,7 @@ export function SummaryHistory() {
   const [summaries, setSummaries] = useState<Summary[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [brokenThumbnails, setBrokenThumbnails] = useState<Set<string>>(new Set());
 
   useEffect(() => {
     const fetchSummaries = async () => {
@@ -132,6 +134,34 @@ export function SummaryHistory() {
                 }
               }}
             >
+              {summary.storage_path && !brokenThumbnails.has(summary.id) && (
+                <Box
+                  component="a"
+                  href={summary.summary_pdf_url}
+                  target="_blank"
+                  rel="noopener noreferrer"
+                  sx={{
+                    display: 'block',
+                    mb: 2,
+                    aspectRatio: '8.5 / 11',
+                    maxHeight: 240,
+                    overflow: 'hidden',
+                    borderRadius: 'var(--radius-md)',
+                    border: '1px solid var(--border-primary)',
+                    backgroundColor: 'white',
+                  }}
+                >
+                  {/* Small first-page PNG rendered and cached by the backend */}
+                  <Box
+                    component="img"
+                    src={createApiUrl(`thumbnails/${summary.storage_path}`)}
+                    alt={`First page of ${summary.title}`}
+                    loading="lazy"
+                    onError={() => setBrokenThumbnails(prev => new Set(prev).add(summary.id))}
+                    sx={{ width: '100%', height: '100%', objectFit: 'cover', objectPosition: 'top', display: 'block' }}
+                  />
+                </Box>
+              )}
               <Typography 
                 variant="h6" 
                 component="h2"